@@ -0,0 +1,89 @@
+"""Compare cold pdflatex compiles with compiles that load a precompiled preamble.
+
+Run from the repository root:
+
+    python benchmarks/bench_compile.py --runs 10
+"""
+from datetime import date, time
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from utils.format_compiler import FormatCompiler  # noqa: E402
+from utils.latex_compiler import compile_latex  # noqa: E402
+from utils.latex_writer import generate_latex_table  # noqa: E402
+
+CONFIG_INFO = {
+    'name': 'John Doe',
+    'address_line1': 'Street Address 123',
+    'address_line2': '12345 City Name',
+    'address_line3': 'Country',
+    'bank_name': 'Bank Name',
+    'clearing_number': '1234-5',
+    'account_number': '123 456 789-0',
+    'iban': 'XX00 0000 0000 0000 0000 0000',
+    'bic': 'XXXXXXXX'
+}
+
+
+def sample_entries(rows):
+    entries = [
+        {
+            'summary': f"Session {i}",
+            'date': date(2024, 1 + i % 12, 1 + i % 28),
+            'start_time': time(9, 0),
+            'end_time': time(11, 30),
+            'description': '',
+            'entry_salary': 400.0
+        }
+        for i in range(rows)
+    ]
+    entries.sort(key=lambda entry: entry['date'])
+    return entries
+
+
+def sample_invoice(rows):
+    entries = sample_entries(rows)
+    return generate_latex_table(entries, 400.0 * rows, 2.5 * rows, 160, CONFIG_INFO)
+
+
+def measure(compile_fn, latex_code, runs, work_root):
+    timings = []
+    for i in range(runs):
+        output_dir = os.path.join(work_root, f"run-{i}")
+        timings.append(timeit.timeit(lambda: compile_fn(latex_code, output_dir), number=1))
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<24} median {statistics.median(timings) * 1000:8.1f} ms   "
+          f"min {min(timings) * 1000:8.1f} ms   max {max(timings) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="compiles per backend")
+    parser.add_argument("--rows", type=int, default=30, help="invoice rows")
+    args = parser.parse_args()
+
+    latex_code = sample_invoice(args.rows)
+    with tempfile.TemporaryDirectory() as work_root:
+        compiler = FormatCompiler(os.path.join(work_root, "formats"))
+        build_time = timeit.timeit(lambda: compiler.format_for(latex_code.partition("\\begin{document}")[0]), number=1)
+
+        cold = measure(compile_latex, latex_code, args.runs, os.path.join(work_root, "cold"))
+        warm = measure(compiler.compile, latex_code, args.runs, os.path.join(work_root, "warm"))
+
+    print(f"Format build (once):     {build_time * 1000:8.1f} ms")
+    report("Cold compile", cold)
+    report("Warm compile (format)", warm)
+    print(f"Speedup (median):        {statistics.median(cold) / statistics.median(warm):8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Time every stage of the invoice pipeline on synthetic calendars and write the results as JSON.
+
+For each calendar size a calendar is generated with generate_ics.py and
+run through the same steps as the GUI: parse_ics, calculate_entry_salaries
+(building the entry store at the hourly rate), filter_entries (month and
+search filter and the invoice's totals), generate_latex_table, write_csv
+(streamed to a file) and compile_latex_to_pdf (a cache miss in a fresh
+render cache). Search latency is measured like the GUI sees it:
+build_search_index builds the n-gram index, and search_keystroke is the
+slowest filter call while --typed is entered one character at a time and
+--pasted is entered at once. Each stage is timed in one pass and its peak traced memory
+is measured in a second pass under tracemalloc, so tracing does not
+inflate the timings.
+
+Run from the repository root:
+
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 100000 --stub-tex -o results.json
+
+Compare two result files from different versions with:
+
+    python benchmarks/bench_pipeline.py --compare old.json new.json
+"""
+from datetime import datetime
+from subprocess import run, PIPE
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from bench_compile import CONFIG_INFO  # noqa: E402
+from generate_ics import generate_ics  # noqa: E402
+from utils.entry_filter import EntryFilter  # noqa: E402
+from utils.entry_store import EntryStore  # noqa: E402
+from utils.format_compiler import FormatCompiler  # noqa: E402
+from utils.invoice import Invoice  # noqa: E402
+from utils.ics_parser import parse_ics  # noqa: E402
+from utils.latex_writer import LATEX_PREAMBLE, render_month_block  # noqa: E402
+from utils.render_cache import RenderCache, engine_version  # noqa: E402
+
+STAGES = ("parse_ics", "calculate_entry_salaries", "filter_entries", "build_search_index", "search_keystroke",
+          "generate_latex_table", "write_csv", "compile_latex_to_pdf")
+
+
+def stub_compile(latex_code, output_dir, jobname="output", engine="pdflatex", cancel_event=None, format_file=None):
+    """Stand-in for compile_latex that writes the .tex and an empty PDF, to benchmark without TeX."""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, f"{jobname}.tex"), "w") as file:
+        file.write(latex_code)
+    pdf_path = os.path.join(output_dir, f"{jobname}.pdf")
+    with open(pdf_path, "wb") as file:
+        file.write(b"%PDF-1.4\n%%EOF\n")
+    return pdf_path
+
+
+def run_pipeline(ics_path, args, work_dir, compiler, stage_hook):
+    """Run the pipeline once; stage_hook(name, fn) runs each stage and returns its result."""
+    render_month_block.cache_clear()
+
+    entries = stage_hook("parse_ics", lambda: parse_ics(ics_path))
+
+    def calculate_entry_salaries():
+        store = EntryStore(entries)
+        store.set_salary_per_hour(args.rate)
+        return store
+
+    store = stage_hook("calculate_entry_salaries", calculate_entry_salaries)
+
+    def filter_entries():
+        index = EntryFilter(store).filter(args.search, args.months)
+        return Invoice(store, index, CONFIG_INFO)
+
+    invoice = stage_hook("filter_entries", filter_entries)
+
+    entry_filter = EntryFilter(store)
+    stage_hook("build_search_index", entry_filter.build_index)
+    queries = [args.typed[:length] for length in range(1, len(args.typed) + 1)] + [args.pasted]
+    for query in queries:
+        stage_hook("search_keystroke", lambda: entry_filter.filter(query, args.months))
+    latex_code = stage_hook("generate_latex_table", lambda: invoice.latex)
+    stage_hook("write_csv", lambda: invoice.write_csv(os.path.join(work_dir, "invoice.csv")))
+
+    if len(invoice) > args.compile_max_rows:
+        return len(entries), len(invoice)
+    cache = RenderCache(tempfile.mkdtemp(dir=work_dir, prefix="renders-"), compiler=compiler)
+    stage_hook("compile_latex_to_pdf",
+               lambda: cache.compile(latex_code, tempfile.mkdtemp(dir=work_dir, prefix="compile-")))
+    return len(entries), len(invoice)
+
+
+def measure_size(events, args, work_dir):
+    ics_path = os.path.join(work_dir, f"bench-{events}.ics")
+    generate_ics(ics_path, events, seed=args.seed)
+    if args.stub_tex:
+        compiler = stub_compile
+    else:
+        format_compiler = FormatCompiler(os.path.join(work_dir, "formats"))
+        # Build the preamble format up front, it is shared by every later compile
+        format_compiler.format_for(LATEX_PREAMBLE)
+        compiler = format_compiler.compile
+
+    # The engine version is part of every render cache key and is looked up once per process
+    engine_version("pdflatex")
+
+    seconds = {}
+
+    def timed(name, fn):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        # Stages run more than once, like search_keystroke, report their slowest run
+        seconds[name] = max(seconds.get(name, 0), time.perf_counter() - start)
+        return result
+
+    parsed, filtered = run_pipeline(ics_path, args, work_dir, compiler, timed)
+
+    peak_bytes = {}
+    if args.memory:
+        def traced(name, fn):
+            gc.collect()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = fn()
+            peak_bytes[name] = max(peak_bytes.get(name, 0), tracemalloc.get_traced_memory()[1] - before)
+            return result
+
+        tracemalloc.start()
+        try:
+            run_pipeline(ics_path, args, work_dir, compiler, traced)
+        finally:
+            tracemalloc.stop()
+
+    return [
+        {
+            "events": events,
+            "entries": parsed,
+            "filtered_entries": filtered,
+            "stage": stage,
+            "seconds": seconds.get(stage),
+            "peak_bytes": peak_bytes.get(stage),
+        }
+        for stage in STAGES
+    ]
+
+
+def git_revision():
+    result = run(["git", "rev-parse", "--short", "HEAD"], stdout=PIPE, stderr=PIPE, text=True,
+                 cwd=os.path.dirname(os.path.abspath(__file__)))
+    return result.stdout.strip() or None
+
+
+def compare(old_path, new_path):
+    """Print the change in time per stage and size between two result files."""
+    with open(old_path) as file:
+        old = {(row["events"], row["stage"]): row for row in json.load(file)["results"]}
+    with open(new_path) as file:
+        new = json.load(file)["results"]
+    print(f"{'events':>9}  {'stage':<26}{'old ms':>10}{'new ms':>10}{'change':>9}")
+    for row in new:
+        before = old.get((row["events"], row["stage"]))
+        if not before or before["seconds"] is None or row["seconds"] is None:
+            continue
+        change = (row["seconds"] - before["seconds"]) / before["seconds"] * 100 if before["seconds"] else 0
+        print(f"{row['events']:>9}  {row['stage']:<26}{before['seconds'] * 1000:>10.1f}"
+              f"{row['seconds'] * 1000:>10.1f}{change:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="calendar sizes in events (default: 1000 10000 100000)")
+    parser.add_argument("--rate", type=float, default=160, help="salary per hour")
+    parser.add_argument("--months", type=int, nargs="+", default=list(range(1, 13)), help="months to keep")
+    parser.add_argument("--search", default="", help="search text for the filter stage")
+    parser.add_argument("--typed", default="exam supervision 4",
+                        help="search text typed one character at a time in the search_keystroke stage")
+    parser.add_argument("--pasted", default="office hours 2",
+                        help="search text entered at once after --typed in the search_keystroke stage")
+    parser.add_argument("--stub-tex", action="store_true", help="replace pdflatex with a stub that writes an empty PDF")
+    parser.add_argument("--compile-max-rows", type=int, default=5000,
+                        help="skip the compile stage for invoices with more rows than this")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc pass")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated calendars")
+    parser.add_argument("-o", "--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="caltotex-bench-") as work_dir:
+        for events in args.sizes:
+            rows = measure_size(events, args, work_dir)
+            for row in rows:
+                if row["seconds"] is not None:
+                    print(f"{events:>9} events  {row['stage']:<26}{row['seconds'] * 1000:>10.1f} ms"
+                          + (f"{row['peak_bytes'] / 2 ** 20:>10.1f} MiB" if row["peak_bytes"] is not None else ""),
+                          file=sys.stderr)
+            results += rows
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stub_tex": args.stub_tex,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the two preview engines: pdflatex with a precompiled preamble and the native PyMuPDF layout.
+
+Each run renders the invoice from scratch, without the render cache, which
+is what the first preview after a filter change costs.
+
+Run from the repository root:
+
+    python benchmarks/bench_preview.py --rows 30 300 3000 --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from bench_compile import CONFIG_INFO, sample_entries  # noqa: E402
+from utils.entry_store import EntryStore  # noqa: E402
+from utils.format_compiler import FormatCompiler  # noqa: E402
+from utils.invoice import Invoice  # noqa: E402
+from utils.latex_writer import LATEX_PREAMBLE  # noqa: E402
+from utils.pdf_writer import write_invoice_pdf  # noqa: E402
+
+
+def sample_invoice(rows):
+    store = EntryStore(sample_entries(rows), 160)
+    return Invoice(store, None, CONFIG_INFO)
+
+
+def measure(render, runs, work_root):
+    timings = []
+    for i in range(runs):
+        output_dir = os.path.join(work_root, f"run-{i}")
+        os.makedirs(output_dir)
+        timings.append(timeit.timeit(lambda: render(output_dir), number=1))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[30, 300, 3000], help="invoice rows")
+    parser.add_argument("--runs", type=int, default=5, help="renders per engine and size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_root:
+        compiler = FormatCompiler(os.path.join(work_root, "formats"))
+        compiler.format_for(LATEX_PREAMBLE)
+
+        print(f"{'rows':>6}  {'pdflatex ms':>12}  {'pymupdf ms':>12}  {'speedup':>8}")
+        for rows in args.rows:
+            invoice = sample_invoice(rows)
+            invoice.latex  # Generate the LaTeX up front, only the rendering is timed
+
+            def render_latex(output_dir):
+                compiler.compile(invoice.latex, output_dir)
+
+            def render_native(output_dir):
+                write_invoice_pdf(os.path.join(output_dir, "output.pdf"), list(invoice.records()),
+                                  invoice.totals.salary, invoice.totals.hours, invoice.salary_per_hour,
+                                  invoice.config_info, invoice.totals.months)
+
+            latex = statistics.median(measure(render_latex, args.runs, os.path.join(work_root, f"latex-{rows}")))
+            native = statistics.median(measure(render_native, args.runs, os.path.join(work_root, f"native-{rows}")))
+            print(f"{rows:>6}  {latex * 1000:>12.1f}  {native * 1000:>12.1f}  {latex / native:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Load-test the invoice service on localhost and report throughput and latency percentiles.
+
+Without --url, a service is started in this process on a free port, with
+its own empty result cache. Requests go out from --concurrency client
+threads; --distinct sets how many of them differ (by hourly rate), so the
+rest are answered from the result cache or coalesced with a render in
+flight. Requests refused with 503 are counted, not retried.
+
+Run from the repository root:
+
+    python benchmarks/bench_server.py --requests 200 --concurrency 16 --distinct 20 --workers 4
+    python benchmarks/bench_server.py --url http://127.0.0.1:8765 --pdf-engine pymupdf
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from bench_compile import CONFIG_INFO  # noqa: E402
+from generate_ics import generate_ics  # noqa: E402
+from server import InvoiceService, ResultCache, make_server  # noqa: E402
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values, which must be sorted."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def send(url, body):
+    """POST body and return (status, seconds, X-Cache header)."""
+    request = Request(url, data=body, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urlopen(request) as response:
+            response.read()
+            return response.status, time.perf_counter() - started, response.headers.get("X-Cache")
+    except HTTPError as e:
+        e.read()
+        return e.code, time.perf_counter() - started, None
+
+
+def run_load(url, bodies, concurrency):
+    results = []
+    lock = threading.Lock()
+
+    def client(body):
+        result = send(url, body)
+        with lock:
+            results.append(result)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client, bodies))
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    latencies = sorted(seconds for status, seconds, _ in results if status == 200)
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(results),
+        'seconds': elapsed,
+        'throughput_per_s': len(latencies) / elapsed if elapsed else None,
+        'statuses': statuses,
+        'cache_hits': sum(1 for status, _, cache in results if status == 200 and cache == "hit"),
+        'latency_ms': {
+            name: percentile(latencies, fraction) * 1000 if latencies else None
+            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="service to test (default: start one in this process)")
+    parser.add_argument("--requests", type=int, default=200, help="requests to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--distinct", type=int, default=20, help="distinct requests among them")
+    parser.add_argument("--events", type=int, default=200, help="events in the calendar sent with each request")
+    parser.add_argument("--format", default="pdf", choices=("pdf", "csv", "tex"), help="requested output")
+    parser.add_argument("--pdf-engine", default="pdflatex", choices=("pdflatex", "pymupdf"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="workers of the started service")
+    parser.add_argument("--queue", type=int, help="queue size of the started service")
+    parser.add_argument("-o", "--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_root:
+        ics_path = os.path.join(work_root, "bench.ics")
+        generate_ics(ics_path, args.events)
+        with open(ics_path, encoding="utf-8", newline="") as file:
+            ics = file.read()
+        bodies = [
+            json.dumps({'ics': ics, 'format': args.format, 'rate': 100 + i % args.distinct,
+                        'pdf_engine': args.pdf_engine}).encode("utf-8")
+            for i in range(args.requests)
+        ]
+
+        service = server = None
+        url = args.url
+        if url is None:
+            service = InvoiceService(CONFIG_INFO, args.workers, args.queue,
+                                     result_cache=ResultCache(os.path.join(work_root, "results")))
+            started = time.perf_counter()
+            service.start()
+            print(f"Started {service.workers} workers in {time.perf_counter() - started:.2f} s")
+            server = make_server(service, port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        try:
+            results, elapsed = run_load(url.rstrip("/") + "/invoice", bodies, args.concurrency)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+                service.shutdown()
+
+    summary = {'url': url, **{key: value for key, value in vars(args).items() if key not in ('url', 'output')},
+               **summarize(results, elapsed)}
+    latency = summary['latency_ms']
+    print(f"{summary['requests']} requests in {elapsed:.2f} s: {summary['throughput_per_s']:.1f} invoices/s, "
+          f"statuses {summary['statuses']}, {summary['cache_hits']} cache hits")
+    if latency['p50'] is not None:
+        print(f"latency p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+              f"p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure cold start time of the GUI and fail if it exceeds a budget.
+
+Each run starts a fresh interpreter, builds the MainWindow on the
+offscreen Qt platform and reports the time until the window has been
+shown. It also checks that no heavy module was imported before that
+point, since those should load on first use or in the background.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py --runs 5 --budget 1.0
+"""
+from subprocess import run, PIPE
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Modules that must not be imported before the window is shown
+HEAVY_MODULES = ("fitz", "pymupdf", "pandas", "numpy", "icalendar")
+
+CHILD = """
+import json, os, sys
+sys.path.insert(0, {src!r})
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+import main
+window = main.MainWindow()
+window.show()
+loaded = sorted(name for name in {heavy!r} if name in sys.modules)
+app.processEvents()
+print(json.dumps({{"heavy_modules": loaded}}), flush=True)
+"""
+
+
+def measure_once():
+    code = CHILD.format(src=SRC_DIR, heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    result = run([sys.executable, "-c", code], stdout=PIPE, stderr=PIPE, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed, report["heavy_modules"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts")
+    parser.add_argument("--budget", type=float, default=1.0, help="maximum median start time in seconds")
+    args = parser.parse_args()
+
+    timings = []
+    heavy = set()
+    for _ in range(args.runs):
+        elapsed, loaded = measure_once()
+        timings.append(elapsed)
+        heavy.update(loaded)
+
+    median = statistics.median(timings)
+    print(f"Cold start: median {median * 1000:.0f} ms, min {min(timings) * 1000:.0f} ms, "
+          f"max {max(timings) * 1000:.0f} ms over {args.runs} runs (budget {args.budget * 1000:.0f} ms)")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: imported before the window was shown: {', '.join(sorted(heavy))}")
+        failed = True
+    if median > args.budget:
+        print("FAIL: median start time is over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Write a synthetic ICS calendar for benchmarking.
+
+The calendar mixes timed single events, all-day events, weekly recurring
+series with exceptions, and events with long multi-line descriptions that
+are folded the way calendar apps export them. The same seed always gives
+the same file.
+
+Run from the repository root:
+
+    python benchmarks/generate_ics.py 100000 -o /tmp/bench-100k.ics
+"""
+from datetime import datetime, timedelta
+import argparse
+import random
+
+SUMMARIES = ("Tutoring", "Lab session", "Exam supervision", "Office hours", "Grading", "Lecture preparation")
+WORDS = ("algebra", "review", "homework", "group", "project", "chapter", "exercise", "notes", "feedback", "quiz")
+
+
+def fold(line):
+    """Fold a content line into 75-character lines as RFC 5545 requires."""
+    parts = [line[:75]]
+    parts += [" " + line[i:i + 74] for i in range(75, len(line), 74)]
+    return "\r\n".join(parts)
+
+
+def description(rng, multiline):
+    if not multiline:
+        return " ".join(rng.choices(WORDS, k=4))
+    paragraphs = [" ".join(rng.choices(WORDS, k=rng.randint(8, 20))) for _ in range(rng.randint(2, 5))]
+    return "\\n".join(paragraphs)
+
+
+def event_lines(rng, uid, kind, start, seed=0):
+    # The seed is part of the UID so calendars generated with different seeds never share events
+    lines = ["BEGIN:VEVENT", f"UID:{uid}-{seed}@bench", f"SUMMARY:{rng.choice(SUMMARIES)} {uid % 97}"]
+    if kind == "allday":
+        lines.append(f"DTSTART;VALUE=DATE:{start:%Y%m%d}")
+        lines.append(f"DTEND;VALUE=DATE:{start + timedelta(days=1):%Y%m%d}")
+    else:
+        end = start + timedelta(minutes=rng.choice((45, 60, 90, 120, 150)))
+        lines.append(f"DTSTART;TZID=Europe/Stockholm:{start:%Y%m%dT%H%M%S}")
+        lines.append(f"DTEND;TZID=Europe/Stockholm:{end:%Y%m%dT%H%M%S}")
+    if kind == "recurring":
+        lines.append(f"RRULE:FREQ=WEEKLY;COUNT={rng.randint(4, 20)}")
+        lines.append(f"EXDATE;TZID=Europe/Stockholm:{start + timedelta(weeks=2):%Y%m%dT%H%M%S}")
+    lines.append(fold("DESCRIPTION:" + description(rng, kind == "multiline")))
+    lines.append("END:VEVENT")
+    return lines
+
+
+def generate_ics(path, events, recurring=0.01, allday=0.05, multiline=0.2, year=2024, seed=0):
+    """Write a calendar with the given number of events and fractions of each event kind."""
+    rng = random.Random(seed)
+    first_day = datetime(year, 1, 1)
+    with open(path, "w", newline="") as file:
+        file.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//CalToTex//Benchmark//EN\r\n")
+        for uid in range(events):
+            roll = rng.random()
+            if roll < recurring:
+                kind = "recurring"
+            elif roll < recurring + allday:
+                kind = "allday"
+            elif roll < recurring + allday + multiline:
+                kind = "multiline"
+            else:
+                kind = "single"
+            start = first_day + timedelta(days=rng.randrange(365), hours=rng.randint(7, 18),
+                                          minutes=rng.choice((0, 15, 30, 45)))
+            file.write("\r\n".join(event_lines(rng, uid, kind, start, seed)) + "\r\n")
+        file.write("END:VCALENDAR\r\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("events", type=int, help="number of VEVENTs")
+    parser.add_argument("-o", "--output", required=True, help="ICS file to write")
+    parser.add_argument("--recurring", type=float, default=0.01, help="fraction of weekly recurring series")
+    parser.add_argument("--allday", type=float, default=0.05, help="fraction of all-day events")
+    parser.add_argument("--multiline", type=float, default=0.2, help="fraction of events with long descriptions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_ics(args.output, args.events, args.recurring, args.allday, args.multiline, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
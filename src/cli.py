@@ -0,0 +1,165 @@
+"""Render invoices from ICS files without the GUI.
+
+Each ICS file is one job. Jobs run in a pool of worker processes, and
+every PDF is compiled in its own temporary directory, so any number of
+invoices can be rendered side by side. With --merge, all files are parsed
+in parallel and rendered as one invoice, with events that appear in
+several calendars counted once.
+
+Example:
+    python src/cli.py calendars/*.ics --rate 160 --months jan feb --split-months -o invoices -j 4
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+import argparse
+import os
+import sys
+
+from utils.calendar_merge import load_calendars
+from utils.config import load_config, DEFAULT_CONFIG_PATH
+from utils.entry_filter import EntryFilter
+from utils.entry_store import EntryStore, MONTH_NAMES
+from utils.format_compiler import FormatCompiler
+from utils.ics_parser import parse_ics
+from utils.instrumentation import configure, span
+from utils.invoice import Invoice
+from utils.pdf_writer import NATIVE_ENGINE
+from utils.recurrence import entries_in_window
+from utils.render_cache import RenderCache
+
+FORMATS = ('csv', 'tex', 'pdf')
+
+# One render cache per worker process, created on its first PDF
+_render_cache = None
+
+
+def parse_month(value):
+    """Accept a month number (1-12) or an English month name or prefix, e.g. "jan"."""
+    if value.isdigit() and 1 <= int(value) <= 12:
+        return int(value)
+    for number, name in enumerate(MONTH_NAMES, start=1):
+        if len(value) >= 3 and name.lower().startswith(value.lower()):
+            return number
+    raise argparse.ArgumentTypeError(f"not a month: {value}")
+
+
+def render_job(job):
+    """Render every requested output for one ICS file and return the written paths."""
+    if 'entries' in job:
+        # Merged calendars arrive already parsed
+        entries = job['entries']
+    else:
+        with span("parse", file=os.path.basename(job['ics'])):
+            entries = parse_ics(job['ics'], job['start'], job['end'])
+    store = EntryStore(entries, job['rate'])
+    entry_filter = EntryFilter(store)
+    stem = job.get('name') or os.path.splitext(os.path.basename(job['ics']))[0]
+
+    if job['split_months']:
+        selections = [(f"{stem}-{MONTH_NAMES[month - 1].lower()}", [month]) for month in job['months']]
+    else:
+        selections = [(stem, job['months'])]
+
+    written = []
+    for name, months in selections:
+        with span("filter", months=len(months)):
+            index = entry_filter.filter(job['search'], months)
+        if job['skip_empty'] and not len(index):
+            continue
+        written.extend(render_invoice(job, store, index, os.path.join(job['output_dir'], name)))
+    return written
+
+
+def render_invoice(job, store, index, output_base):
+    with span("totals", entries=len(index)):
+        invoice = Invoice(store, index, job['config_info'], job['table_mode'])
+
+    global _render_cache
+    if _render_cache is None and 'pdf' in job['formats']:
+        _render_cache = RenderCache(compiler=FormatCompiler().compile)
+    return invoice.export(output_base, _render_cache, job['formats'], job['compress_csv'], engine=job['pdf_engine'])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Render CSV, TEX and PDF invoices from ICS files.")
+    parser.add_argument("ics_files", nargs="+", help="calendar files to render")
+    parser.add_argument("-o", "--output-dir", default=".", help="directory for the rendered files")
+    parser.add_argument("-f", "--format", dest="formats", nargs="+", choices=FORMATS, default=list(FORMATS),
+                        help="outputs to render (default: all)")
+    parser.add_argument("-r", "--rate", type=float, default=160, help="salary per hour (default: 160)")
+    parser.add_argument("-m", "--months", nargs="+", type=parse_month, default=list(range(1, 13)),
+                        help="months to include, as numbers or names (default: all)")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat,
+                        help="first date to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat,
+                        help="last date to include (YYYY-MM-DD)")
+    parser.add_argument("-s", "--search", default="", help="only include entries matching this text")
+    parser.add_argument("--compress-csv", action="store_true", help="write gzip-compressed .csv.gz files")
+    parser.add_argument("--merge", metavar="NAME",
+                        help="render one invoice called NAME across all calendars instead of one per file")
+    parser.add_argument("--split-months", action="store_true", help="render one invoice per month")
+    parser.add_argument("--skip-empty", action="store_true", help="do not render invoices without entries")
+    parser.add_argument("--table-mode", choices=("auto", "float", "longtable"), default="auto",
+                        help="single-page table, multi-page longtable, or longtable for long invoices (default)")
+    parser.add_argument("--pdf-engine", choices=("pdflatex", NATIVE_ENGINE), default="pdflatex",
+                        help="compile PDFs with pdflatex (default) or lay them out with PyMuPDF, which needs no TeX")
+    parser.add_argument("-c", "--config", default=DEFAULT_CONFIG_PATH, help="personal and banking config file")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of files rendered at the same time (default: CPU count)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    config_info = load_config(args.config)
+    end = args.end + timedelta(days=1) if args.end else None
+    if args.merge:
+        with span("parse", files=len(args.ics_files)):
+            entries, recurrences = load_calendars(args.ics_files, max_workers=max(1, args.jobs))
+        sources = [(args.merge, {'name': args.merge,
+                                 'entries': entries_in_window(entries, recurrences, args.start, end)})]
+    else:
+        sources = [(ics_file, {}) for ics_file in args.ics_files]
+
+    jobs = [
+        {
+            'ics': ics_file,
+            'output_dir': args.output_dir,
+            'formats': set(args.formats),
+            'rate': args.rate,
+            'months': sorted(set(args.months)),
+            'start': args.start,
+            'end': end,
+            'search': args.search,
+            'split_months': args.split_months,
+            'compress_csv': args.compress_csv,
+            'skip_empty': args.skip_empty,
+            'table_mode': args.table_mode,
+            'pdf_engine': args.pdf_engine,
+            'config_info': config_info,
+            **extra,
+        }
+        for ics_file, extra in sources
+    ]
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {executor.submit(render_job, job): job['ics'] for job in jobs}
+        for future in as_completed(futures):
+            ics_file = futures[future]
+            try:
+                for path in future.result():
+                    print(f"{ics_file}: wrote {path}")
+            except Exception as e:
+                # Any error, a malformed calendar included, fails only this file; the batch carries on
+                failures += 1
+                print(f"{ics_file}: failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    configure()
+    sys.exit(main())
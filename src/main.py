@@ -1,21 +1,45 @@
-from PyQt6.QtWidgets import QApplication, QMainWindow, QFileDialog, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QPushButton, QLabel, QComboBox, QTextEdit
-from PyQt6.QtGui import QPixmap
+from PyQt6.QtWidgets import QApplication, QMainWindow, QFileDialog, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QPushButton, QComboBox, QTextEdit
+from PyQt6.QtWidgets import QHeaderView, QTabWidget, QTableView
 from PyQt6.QtCore import Qt
-from utils.file_handler import open_ics_file, save_csv_file
-from utils.ics_parser import parse_ics
-from utils.csv_writer import write_csv
+from utils.file_handler import open_ics_file
+from utils.calendar_cache import CalendarCache
+from utils.calendar_merge import diff_entries, load_calendars
+from utils.recurrence import RecurrenceSet, expansion_years
+from utils.config import load_config
+from utils.entry_table import DATE_COLUMN, EntryTableModel
+from utils.invoice import Invoice, split_extension
+from utils.preview_worker import PreviewWorker
+from utils.pdf_writer import NATIVE_ENGINE
+from utils.pdf_preview import PdfPreview
+from utils.render_cache import RenderCache
+from utils.format_compiler import FormatCompiler
+from utils.latex_compiler import LatexCompileError
+from utils.instrumentation import configure, span, timings
+from PyQt6.QtCore import QFileSystemWatcher, QTimer
+from concurrent.futures import ThreadPoolExecutor
+import importlib
+import logging
 import os
-import fitz  # PyMuPDF
-from subprocess import run, CalledProcessError
-import pandas as pd
+import shutil
 import sys
+import threading
 from PyQt6.QtWidgets import QCheckBox, QGroupBox
-import configparser
+
+# Imported in the background once the window is shown, so startup does not wait for them
+BACKGROUND_IMPORTS = ("numpy", "pandas", "icalendar", "fitz", "utils.entry_store", "utils.entry_filter")
+
+# Calendar syncs often write a file several times in a row, so reloads wait for this long after the last change
+RELOAD_DELAY_MS = 500
+
+# Stages whose latest latency is shown in the status bar
+STATUS_STAGES = ("parse", "filter", "totals", "latex", "compile", "render")
+
+logger = logging.getLogger(__name__)
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
-        print("Initializing MainWindow...")  # Debug statement
+        logger.debug("Initializing MainWindow")
         super().__init__()
         self.setWindowTitle("ICS to CSV Converter")
         self.setGeometry(100, 100, 1200, 600)  # Increased width for PDF preview
@@ -24,27 +48,96 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.central_widget)
         self.layout = QHBoxLayout(self.central_widget)  # Use horizontal layout for side-by-side previews
 
-        self.file_path = ""
+        self.file_paths = []  # Calendars merged into one invoice
         self.salary_per_hour = 160
 
         # Initialize class variables
         self.entries = []  # To store all parsed entries
-        self.filtered_entries = []  # To store filtered entries
-        
-        # Load personal and banking information from config
-        self.config_info = self.load_config()
+        self.recurrences = RecurrenceSet()  # Recurring series of the loaded calendar, expanded per month
+        self.expanded_months = set()
+        self.expansion_years = range(0)
+        self._entry_store = None  # Columnar hours and salary for all entries, built on first use
+        self._entry_filter = None  # Month and search index over the store, built on first use
+        # Builds the search index of the current filter off the GUI thread, one build at a time
+        self._index_builder = ThreadPoolExecutor(max_workers=1)
+        self._invoice = None  # Invoice for the current filter state, shared by the previews and the exports
+        self._latex_shown = None  # Invoice whose LaTeX is in the LaTeX view
+
+        # Personal and banking information, read from the config file on first use
+        self._config_info = None
+
+        # Compiled PDFs and preview images, shared by the preview and the save actions
+        self.render_cache = RenderCache(compiler=FormatCompiler().compile)
+
+        # Parsed calendars, so reopening an unchanged file skips parsing
+        self.calendar_cache = CalendarCache()
         
-        print("MainWindow initialized.")  # Debug statement
+        logger.debug("MainWindow initialized")
         self.init_ui()
 
+        # Runs on the first pass of the event loop, after the window is shown
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Load the config and warm up heavy modules without delaying the first paint."""
+        self.config_info  # Reads the config file
+        threading.Thread(target=lambda: [importlib.import_module(name) for name in BACKGROUND_IMPORTS],
+                         daemon=True).start()
+
+    @property
+    def config_info(self):
+        if self._config_info is None:
+            self._config_info = self.load_config()
+        return self._config_info
+
+    @property
+    def entry_store(self):
+        if self._entry_store is None:
+            from utils.entry_store import EntryStore
+            self._entry_store = EntryStore(self.entries, self.salary_per_hour)
+        return self._entry_store
+
+    @property
+    def entry_filter(self):
+        if self._entry_filter is None:
+            from utils.entry_filter import EntryFilter
+            self._entry_filter = EntryFilter(self.entry_store)
+            # Searches scan every text until the index is ready, so typing never waits for it
+            self._index_builder.submit(self._entry_filter.build_index)
+        return self._entry_filter
+
+    def discard_entry_filter(self):
+        """Drop the filter for outdated entries, stopping its index build; a new one is made on next use."""
+        if self._entry_filter is not None:
+            self._entry_filter.cancel_index()
+            self._entry_filter = None
+
+    @property
+    def invoice(self):
+        if self._invoice is None:
+            self._invoice = Invoice(self.entry_store, None, self.config_info)
+        return self._invoice
+
     def init_ui(self):
         # Left-side layout for controls
         left_layout = QVBoxLayout()
 
-        self.file_button = QPushButton("Select ICS File")
+        self.file_button = QPushButton("Select ICS Files")
         self.file_button.clicked.connect(self.select_file)
         left_layout.addWidget(self.file_button)
 
+        # Reload the open calendars when they change on disk, e.g. after a sync
+        self.watch_checkbox = QCheckBox("Reload when files change")
+        self.watch_checkbox.setChecked(True)
+        self.watch_checkbox.stateChanged.connect(self.watch_files)
+        left_layout.addWidget(self.watch_checkbox)
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.schedule_reload)
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(RELOAD_DELAY_MS)
+        self.reload_timer.timeout.connect(self.reload_entries)
+
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search entries...")
         self.search_bar.textChanged.connect(self.filter_entries)
@@ -78,9 +171,25 @@ class MainWindow(QMainWindow):
         self.salary_input.textChanged.connect(self.update_salary_per_hour)
         left_layout.addWidget(self.salary_input)
 
-        self.preview_area = QTextEdit()
-        self.preview_area.setReadOnly(True)
-        left_layout.addWidget(self.preview_area)
+        # The PDF preview is compiled with pdflatex or laid out natively, which is instant and needs no TeX;
+        # saved PDFs are always compiled with pdflatex
+        self.engine_selector = QComboBox()
+        self.engine_selector.addItem("Preview with pdflatex", "pdflatex")
+        self.engine_selector.addItem("Fast preview (PyMuPDF)", NATIVE_ENGINE)
+        if shutil.which("pdflatex") is None:
+            self.engine_selector.setCurrentIndex(1)
+        self.engine_selector.currentIndexChanged.connect(self.change_preview_engine)
+        left_layout.addWidget(self.engine_selector)
+
+        # Filtered entries, formatted only as their rows scroll into view
+        self.entry_model = EntryTableModel(self)
+        self.entry_table = QTableView()
+        self.entry_table.setModel(self.entry_model)
+        self.entry_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.entry_table.horizontalHeader().setStretchLastSection(True)
+        self.entry_table.setSortingEnabled(True)
+        self.entry_table.sortByColumn(DATE_COLUMN, Qt.SortOrder.AscendingOrder)
+        left_layout.addWidget(self.entry_table)
 
         # Add save buttons in a horizontal layout
         save_buttons_layout = QHBoxLayout()
@@ -106,71 +215,37 @@ class MainWindow(QMainWindow):
         # Add left layout to the main layout
         self.layout.addLayout(left_layout)
 
-        # Right-side layout for LaTeX and PDF previews
-        right_layout = QVBoxLayout()
+        # Right-side tabs for the PDF and LaTeX previews; the LaTeX view is only filled while its tab is shown
+        self.preview_tabs = QTabWidget()
 
-        # Horizontal layout for LaTeX and PDF previews
-        preview_layout = QHBoxLayout()
+        self.pdf_preview = PdfPreview()
+        self.pdf_preview.pages_rendered.connect(self.show_stage_timings)
+        self.preview_tabs.addTab(self.pdf_preview, "PDF")
 
         self.latex_preview_area = QTextEdit()
         self.latex_preview_area.setReadOnly(True)
-        preview_layout.addWidget(self.latex_preview_area)
-
-        self.pdf_preview_label = QLabel("PDF Preview will appear here.")
-        self.pdf_preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        preview_layout.addWidget(self.pdf_preview_label)
+        self.preview_tabs.addTab(self.latex_preview_area, "LaTeX")
+        self.preview_tabs.currentChanged.connect(self.update_latex_preview)
 
-        # Add the horizontal preview layout to the right layout
-        right_layout.addLayout(preview_layout)
+        self.layout.addWidget(self.preview_tabs, stretch=1)
 
-        self.layout.addLayout(right_layout)
-        print("UI initialized.")  # Debug statement
+        # Compile PDF previews in the background so typing never waits on pdflatex
+        self.preview_worker = PreviewWorker(self.render_cache, engine=self.engine_selector.currentData(), parent=self)
+        self.preview_worker.pdf_ready.connect(self.display_pdf)
+        self.preview_worker.compile_failed.connect(self.show_compile_error)
+        logger.debug("UI initialized")
 
     def load_config(self):
         """Load personal and banking information from config file."""
-        config = configparser.ConfigParser()
-        config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.txt')
-        
-        # Default values
-        default_config = {
-            'name': 'John Doe',
-            'address_line1': 'Street Address 123',
-            'address_line2': '12345 City Name',
-            'address_line3': 'Country',
-            'bank_name': 'Bank Name',
-            'clearing_number': '1234-5',
-            'account_number': '123 456 789-0',
-            'iban': 'XX00 0000 0000 0000 0000 0000',
-            'bic': 'XXXXXXXX'
-        }
-        
-        try:
-            config.read(config_path)
-            return {
-                'name': config.get('Personal Information', 'name', fallback=default_config['name']),
-                'address_line1': config.get('Personal Information', 'address_line1', fallback=default_config['address_line1']),
-                'address_line2': config.get('Personal Information', 'address_line2', fallback=default_config['address_line2']),
-                'address_line3': config.get('Personal Information', 'address_line3', fallback=default_config['address_line3']),
-                'bank_name': config.get('Banking Information', 'bank_name', fallback=default_config['bank_name']),
-                'clearing_number': config.get('Banking Information', 'clearing_number', fallback=default_config['clearing_number']),
-                'account_number': config.get('Banking Information', 'account_number', fallback=default_config['account_number']),
-                'iban': config.get('Banking Information', 'iban', fallback=default_config['iban']),
-                'bic': config.get('Banking Information', 'bic', fallback=default_config['bic'])
-            }
-        except Exception as e:
-            print(f"Error loading config file: {e}. Using default values.")
-            return default_config
+        return load_config()
 
     def toggle_month_checkboxes(self, state):
         """Enable or disable individual month checkboxes based on the 'All Months' checkbox."""
-        print(f"DEBUG: State value: {state}")  # Debug statement
         if state:
-            print("All Months selected: Disabling individual month checkboxes.")
             # Disable individual month checkboxes when "All Months" is checked
             for checkbox in self.month_checkboxes.values():
                 checkbox.setEnabled(False)
         else:
-            print("All Months deselected: Enabling individual month checkboxes.")
             # Enable individual month checkboxes when "All Months" is unchecked
             for checkbox in self.month_checkboxes.values():
                 checkbox.setEnabled(True)
@@ -181,314 +256,248 @@ class MainWindow(QMainWindow):
     def update_salary_per_hour(self):
         try:
             self.salary_per_hour = float(self.salary_input.text())
-            print(f"Updated Salary Per Hour: {self.salary_per_hour}")  # Debug statement
+            logger.debug("Updated salary per hour: %s", self.salary_per_hour)
             # Recalculate entry salaries with the new rate
             self.calculate_entry_salaries()
             # Update all previews to reflect the new calculations
             self.filter_entries()
         except ValueError:
             self.salary_per_hour = 0  # Default to 0 if input is invalid
-            print("Invalid Salary Per Hour input. Defaulting to 0.")
+            logger.info("Invalid salary per hour input, defaulting to 0")
 
     def select_file(self):
-        self.file_path, _ = QFileDialog.getOpenFileName(self, "Open ICS File", "", "ICS Files (*.ics)")
-        if self.file_path:
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Open ICS Files", "", "ICS Files (*.ics)")
+        if file_paths:
+            self.file_paths = file_paths
             self.load_entries()
+            self.watch_files()
 
     def calculate_entry_salaries(self):
         """Calculate the salary for each entry based on the start and end times."""
-        for entry in self.entries:
-            hours_worked = (entry['end_time'].hour - entry['start_time'].hour) + \
-                        (entry['end_time'].minute - entry['start_time'].minute) / 60
-            entry['entry_salary'] = hours_worked * self.salary_per_hour
-            print(f"Calculated entry_salary for {entry['summary']}: {entry['entry_salary']}")  # Debug statement
+        self.entry_store.set_salary_per_hour(self.salary_per_hour)
 
     def load_entries(self):
         try:
-            self.entries = parse_ics(self.file_path)  # Store parsed entries in the class variable
-            print(f"DEBUG: Entries returned by parse_ics: {self.entries}")  # Debug statement
-            self.calculate_entry_salaries()  # Calculate salaries for each entry
+            # Single events are parsed up front, recurring series are expanded per month as they are selected
+            # Several calendars are parsed in parallel and merged, dropping events that appear in more than one
+            with span("parse", files=len(self.file_paths)):
+                self.entries, self.recurrences = load_calendars(self.file_paths, self.calendar_cache)
+            self.expanded_months = set()
+            self.expansion_years = expansion_years(self.entries, self.recurrences)
+            logger.info("Loaded %d entries and %d recurring events from %s",
+                        len(self.entries), len(self.recurrences.blocks), ", ".join(self.file_paths))
+            # Hours, salaries and the search index are rebuilt for the new entries on next use
+            self._entry_store = None
+            self.discard_entry_filter()
             self.filter_entries()  # Filter entries based on current search and month
         except Exception as e:
-            self.preview_area.setText(f"Error loading ICS file: {e}")
+            logger.exception("Error loading ICS files %s", ", ".join(self.file_paths))
+            self.entry_model.clear()
+            self.statusBar().showMessage(f"Error loading ICS file: {e}")
+
+    def watch_files(self, *args):
+        """Watch the open calendars for changes while the reload checkbox is checked."""
+        watched = self.file_watcher.files()
+        if watched:
+            self.file_watcher.removePaths(watched)
+        if self.watch_checkbox.isChecked():
+            paths = [path for path in self.file_paths if os.path.exists(path)]
+            if paths:
+                self.file_watcher.addPaths(paths)
+
+    def schedule_reload(self, path):
+        # Files replaced by a rename drop out of the watcher, so watch them again
+        if os.path.exists(path) and path not in self.file_watcher.files():
+            self.file_watcher.addPath(path)
+        self.reload_timer.start()
+
+    def reload_entries(self):
+        """Reload the open calendars and re-render only what their changes affect.
+
+        The new entries are compared with the current ones by UID and
+        occurrence start. Hours and salaries are only computed for added and
+        changed entries, and previews are only refreshed if a change falls
+        in a selected month. The LaTeX month blocks that did not change come
+        from the block cache, and an unchanged invoice from the render cache.
+        """
+        try:
+            with span("reload", files=len(self.file_paths)):
+                entries, recurrences = load_calendars(self.file_paths, self.calendar_cache)
+                self.expansion_years = expansion_years(entries, recurrences)
+                if self.expanded_months:
+                    entries = sorted(entries + recurrences.occurrences_in_months(
+                        self.expansion_years, sorted(self.expanded_months)), key=lambda entry: entry['date'])
+                diff = diff_entries(self.entries, entries)
+        except Exception:
+            logger.exception("Error reloading ICS files %s", ", ".join(self.file_paths))
+            return
 
-    def update_csv_preview(self):
-        csv_data = write_csv(self.filtered_entries, self.salary_per_hour)
-        self.preview_area.setText(csv_data)
+        self.recurrences = recurrences
+        if not (diff.added or diff.removed or diff.changed):
+            logger.debug("Reloaded calendars without changes")
+            return
+        logger.info("Reloaded calendars: %d added, %d removed, %d changed entries",
+                    len(diff.added), len(diff.removed), len(diff.changed))
+
+        if self._entry_store is not None:
+            from utils.entry_store import EntryStore
+            self._entry_store = EntryStore.from_diff(self._entry_store, entries, diff.old_positions)
+        self.entries = entries
+        self.discard_entry_filter()
+
+        affected_months = {entry['date'].month
+                           for entry in diff.added + diff.removed + diff.changed + diff.changed_from}
+        if affected_months & set(self.selected_months()):
+            self.filter_entries()
 
-    def update_latex_preview(self):
-        total_salary = sum(entry['entry_salary'] for entry in self.filtered_entries)
-        total_hours = sum((entry['end_time'].hour - entry['start_time'].hour) +
-                        (entry['end_time'].minute - entry['start_time'].minute) / 60
-                        for entry in self.filtered_entries)
-        latex_table = self.generate_latex_table(self.filtered_entries, total_salary, total_hours, self.salary_per_hour)
-        self.latex_preview_area.setText(latex_table)
+    def update_entry_table(self, index):
+        self.entry_model.set_rows(self.entry_store, index)
+
+    def update_latex_preview(self, *args):
+        # Laying out the LaTeX text is slow for long invoices, so it waits until the tab is shown
+        if self.preview_tabs.currentWidget() is not self.latex_preview_area or self._latex_shown is self.invoice:
+            return
+        self.latex_preview_area.setPlainText(self.invoice.latex)
+        self._latex_shown = self.invoice
 
     def update_pdf_preview(self):
-        total_salary = sum(entry['entry_salary'] for entry in self.filtered_entries)
-        total_hours = sum((entry['end_time'].hour - entry['start_time'].hour) +
-                        (entry['end_time'].minute - entry['start_time'].minute) / 60
-                        for entry in self.filtered_entries)
-        latex_table = self.generate_latex_table(self.filtered_entries, total_salary, total_hours, self.salary_per_hour)
-        self.compile_latex_to_pdf(latex_table)
+        self.render_pdf_preview(self.invoice)
 
     def filter_entries(self, *args):
         """Filter entries based on search text and selected months."""
         if not isinstance(self.entries, list):
-            self.preview_area.setText("Error: Invalid data format. Expected a list.")
+            self.statusBar().showMessage("Error: Invalid data format. Expected a list.")
             return
 
-        valid_entries = [entry for entry in self.entries if isinstance(entry, dict)]
-        search_text = self.search_bar.text().lower()
+        search_text = self.search_bar.text()
+        selected_months = self.selected_months()
+        self.expand_recurrences(selected_months)
 
-        # Determine selected months
-        selected_months = []
-        if self.select_all_checkbox.isChecked():
-            selected_months = list(range(1, 13))  # All months
-        else:
-            for i, month in enumerate(self.month_checkboxes.keys(), start=1):
-                if self.month_checkboxes[month].isChecked():
-                    selected_months.append(i)
-
-        # If no months are selected, filter out all entries
-        if not selected_months:
-            self.filtered_entries = []
-        else:
-            # Filter entries based on search text and selected months
-            self.filtered_entries = [
-                entry for entry in valid_entries
-                if (search_text in entry.get('summary', '').lower() or search_text in entry.get('description', '').lower()) and
-                (entry['date'].month in selected_months)
-            ]
+        # Filter entries based on search text and selected months; no selected months filters out all entries
+        with span("filter", months=len(selected_months)):
+            index = self.entry_filter.filter(search_text, selected_months)
+        # The invoice holds the store and the row index, its rows are only copied where they are formatted
+        with span("totals", entries=len(index)):
+            self._invoice = Invoice(self.entry_store, index, self.config_info)
 
         # Update previews in real time
-        self.update_csv_preview()
+        self.update_entry_table(index)
         self.update_latex_preview()
         self.update_pdf_preview()
+        self.show_stage_timings()
 
-    def convert_to_csv_and_latex(self):
-        # Calculate total salary and total hours
-        total_salary = sum(entry['entry_salary'] for entry in self.filtered_entries)
-        total_hours = sum((entry['end_time'].hour - entry['start_time'].hour) + 
-                        (entry['end_time'].minute - entry['start_time'].minute) / 60
-                        for entry in self.filtered_entries)
+    def selected_months(self):
+        """Return the numbers of the months selected in the month checkboxes."""
+        if self.select_all_checkbox.isChecked():
+            return list(range(1, 13))  # All months
+        selected_months = []
+        for i, month in enumerate(self.month_checkboxes.keys(), start=1):
+            if self.month_checkboxes[month].isChecked():
+                selected_months.append(i)
+        return selected_months
+
+    def expand_recurrences(self, months):
+        """Add the occurrences of recurring series in months that have not been expanded yet."""
+        months = [month for month in months if month not in self.expanded_months]
+        if not months or not self.recurrences:
+            return
+        self.expanded_months.update(months)
+        with span("expand", months=len(months)):
+            occurrences = self.recurrences.occurrences_in_months(self.expansion_years, months)
+        if occurrences:
+            self.entries = sorted(self.entries + occurrences, key=lambda entry: entry['date'])
+            self._entry_store = None
+            self.discard_entry_filter()
 
+    def convert_to_csv_and_latex(self):
         # Convert to CSV
-        csv_data = write_csv(self.filtered_entries, self.salary_per_hour)
-        csv_data += f"\nTotal Hours,,,{total_hours:.2f},Salary Per Hour,,,{self.salary_per_hour},Total Salary,,,{total_salary}"  # Add total hours, salary per hour, and total salary at the bottom
-        save_csv_file(csv_data)
+        self.save_csv()
 
         # Convert to LaTeX
-        latex_table = self.generate_latex_table(self.filtered_entries, total_salary, total_hours, self.salary_per_hour)
-        self.latex_preview_area.setText(latex_table)
+        self.update_latex_preview()
 
         # Compile LaTeX to PDF and display it
-        self.compile_latex_to_pdf(latex_table)
-
-    def generate_latex_table(self, entries, total_salary, total_hours, salary_per_hour):
-        # Define reusable variables for LaTeX document structure
-        header = (
-            "\\documentclass{article}\n"
-            "\\usepackage[utf8]{inputenc}\n"
-            "\\usepackage{geometry}\n"
-            "\\geometry{a4paper, margin=1in}\n"
-            "\\begin{document}\n"
-        )
-        footer = "\\end{document}"
-        address = (
-            "\\begin{minipage}[t]{0.45\\textwidth}\n"
-            f"{{{self.config_info['name']}}}\\\\\n"
-            f"{self.config_info['address_line1']}\\\\\n"
-            f"{self.config_info['address_line2']}\\\\\n"
-            f"{self.config_info['address_line3']}\\\\\n"
-            "\\end{minipage}\n"
-        )
-        banking_details = (
-            "\\begin{minipage}[t]{0.45\\textwidth}\n"
-            f"{self.config_info['bank_name']}\\\\\n"
-            f"Clearing number: {self.config_info['clearing_number']}\\\\\n"
-            f"Account number: {self.config_info['account_number']}\\\\\n"
-            f"IBAN: {self.config_info['iban']}\\\\\n"
-            f"BIC: {self.config_info['bic']}\\\\\n"
-            "\\end{minipage}\n"
-        )
-        table_header = (
-            "\\begin{table}[h!]\n"
-            "\\centering\n"
-            "\\begin{tabular}{|l|l|l|l|l|}\n"
-            "\\hline\n"
-            "\\textbf{Summary} & \\textbf{Date} & \\textbf{Start Time} & \\textbf{End Time} & \\textbf{Salary} \\\\\n"
-            "\\hline\n"
-        )
-        empty_table = (
-            "\\multicolumn{5}{|c|}{No entries available} \\\\\n"
-            "\\hline\n"
-        )
-        table_footer = "\\end{tabular}\n\\caption{Invoice Details}\n\\end{table}\n"
-
-        if not entries:
-            return (
-            header
-            + "\\begin{center}{\\LARGE \\textbf{Salary Invoice}}\\end{center}\n"
-            + "\\vspace{0.5cm}\n"
-            + "\\noindent\n"
-            + address
-            + "\\hfill\n"
-            + banking_details
-            + "\\vspace{1cm}\n"
-            + table_header
-            + empty_table
-            + table_footer
-            + footer
-            )
-
-        # Group entries by month
-        grouped_entries = {}
-        for entry in entries:
-            month = entry['date'].strftime("%B")
-            grouped_entries.setdefault(month, []).append(entry)
-
-        latex = (
-            header
-            + "\\begin{center}{\\LARGE \\textbf{Salary Invoice}}\\end{center}\n"
-            + "\\vspace{0.5cm}\n"
-            + "\\noindent\n"
-            + address
-            + "\\hfill\n"
-            + banking_details
-            + "\\vspace{1cm}\n"
-            + table_header
-        )
-
-        for month, month_entries in grouped_entries.items():
-            latex += f"\\multicolumn{{5}}{{|c|}}{{\\textbf{{{month}}}}} \\\\ \n\\hline\n"
-            month_total_salary = 0
-            month_total_hours = 0
-
-            for entry in month_entries:
-                hours_worked = (entry['end_time'].hour - entry['start_time'].hour) + \
-                               (entry['end_time'].minute - entry['start_time'].minute) / 60
-                month_total_hours += hours_worked
-                month_total_salary += entry['entry_salary']
-                latex += f"{entry['summary']} & {entry['date']} & {entry['start_time']} & {entry['end_time']} & {entry['entry_salary']:.2f} \\\\\n"
-
-            latex += (
-            f"\\hline\n\\multicolumn{{3}}{{|r|}}{{\\textbf{{Total for {month}:}}}} & "
-            f"\\textbf{{{month_total_hours:.2f} hours}} & \\textbf{{{month_total_salary:.2f}}} \\\\ \n"
-            "\\hline\n"
-            )
-
-        latex += (
-            f"\\hline\n\\multicolumn{{2}}{{|r|}}{{\\textbf{{Total Hours:}} {total_hours:.2f}}} & "
-            f"\\multicolumn{{1}}{{r|}}{{\\textbf{{Salary Per Hour:}} {salary_per_hour:.2f}}} & "
-            f"\\multicolumn{{2}}{{r|}}{{\\textbf{{Total Salary:}} {total_salary:.2f}}} \\\\\n"
-            "\\hline\n"
-            + table_footer
-            + footer
-        )
-
-        return latex
-
-    def compile_latex_to_pdf(self, latex_code):
-        # Save LaTeX code to a temporary file
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        tex_file = os.path.join(temp_dir, "output.tex")
-        pdf_file = os.path.join(temp_dir, "output.pdf")
-
-        with open(tex_file, "w") as file:
-            file.write(latex_code)
-
-        # Compile LaTeX to PDF using pdflatex
-        try:
-            run(["pdflatex", "-output-directory", temp_dir, tex_file], check=True)
-            self.display_pdf(pdf_file)
-        except CalledProcessError as e:
-            self.latex_preview_area.setText(f"Error compiling LaTeX: {e}")
+        self.render_pdf_preview(self.invoice)
 
-    def display_pdf(self, pdf_path):
-        # Render the first page of the PDF as an image
-        doc = fitz.open(pdf_path)
-        page = doc[0]
-        pix = page.get_pixmap()
-        image_path = pdf_path.replace(".pdf", ".png")
-        pix.save(image_path)
+    def change_preview_engine(self, *args):
+        self.preview_worker.engine = self.engine_selector.currentData()
+        self.update_pdf_preview()
 
-        # Display the image in the QLabel
-        pixmap = QPixmap(image_path)
-        self.pdf_preview_label.setPixmap(pixmap)
+    def render_pdf_preview(self, invoice):
+        # Queue the compile on the preview worker; display_pdf runs once the latest result is ready
+        self.preview_worker.request(invoice)
+
+    def show_compile_error(self, message):
+        self.preview_tabs.setCurrentWidget(self.latex_preview_area)
+        self.latex_preview_area.setPlainText(f"Error compiling LaTeX: {message}")
+        self._latex_shown = None
+        self.show_stage_timings()
+
+    def display_pdf(self, pdf_path):
+        # Pages are rendered in memory as they scroll into view
+        self.pdf_preview.set_document(pdf_path)
+
+    def show_stage_timings(self, *args):
+        """Show the latest latency of each pipeline stage in the status bar."""
+        parts = []
+        for stage in STATUS_STAGES:
+            seconds = timings.last(stage)
+            if seconds is not None:
+                parts.append(f"{stage} {seconds * 1000:.0f} ms")
+        self.statusBar().showMessage("  ·  ".join(parts))
 
     def save_csv(self):
         """Save only the CSV file."""
-        total_salary = sum(entry['entry_salary'] for entry in self.filtered_entries)
-        total_hours = sum((entry['end_time'].hour - entry['start_time'].hour) +
-                        (entry['end_time'].minute - entry['start_time'].minute) / 60
-                        for entry in self.filtered_entries)
-        csv_data = write_csv(self.filtered_entries, self.salary_per_hour)
-        csv_data += f"\nTotal Hours,,,{total_hours:.2f},Salary Per Hour,,,{self.salary_per_hour},Total Salary,,,{total_salary}"
-        
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save CSV File", "output.csv", "CSV Files (*.csv)")
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save CSV File", "output.csv",
+                                                   "CSV Files (*.csv);;Compressed CSV Files (*.csv.gz)")
         if file_path:
-            with open(file_path, 'w') as file:
-                file.write(csv_data)
-            print(f"CSV file saved successfully to {file_path}")
+            # Rows are streamed to the file; a .csv.gz name writes gzip-compressed output
+            self.invoice.write_csv(file_path)
+            logger.info("CSV file saved to %s", file_path)
 
     def save_tex(self):
         """Save only the LaTeX file."""
-        total_salary = sum(entry['entry_salary'] for entry in self.filtered_entries)
-        total_hours = sum((entry['end_time'].hour - entry['start_time'].hour) +
-                        (entry['end_time'].minute - entry['start_time'].minute) / 60
-                        for entry in self.filtered_entries)
-        latex_table = self.generate_latex_table(self.filtered_entries, total_salary, total_hours, self.salary_per_hour)
-        
         file_path, _ = QFileDialog.getSaveFileName(self, "Save TEX File", "output.tex", "LaTeX Files (*.tex)")
         if file_path:
-            with open(file_path, "w") as file:
-                file.write(latex_table)
-            print(f"TEX file saved successfully to {file_path}")
+            self.invoice.write_tex(file_path)
+            logger.info("TEX file saved to %s", file_path)
 
     def save_pdf(self):
         """Save only the PDF file."""
-        total_salary = sum(entry['entry_salary'] for entry in self.filtered_entries)
-        total_hours = sum((entry['end_time'].hour - entry['start_time'].hour) +
-                        (entry['end_time'].minute - entry['start_time'].minute) / 60
-                        for entry in self.filtered_entries)
-        latex_table = self.generate_latex_table(self.filtered_entries, total_salary, total_hours, self.salary_per_hour)
-        
         file_path, _ = QFileDialog.getSaveFileName(self, "Save PDF File", "output.pdf", "PDF Files (*.pdf)")
         if file_path:
-            # Save LaTeX to a temporary file
-            temp_dir = "temp"
-            os.makedirs(temp_dir, exist_ok=True)
-            tex_file = os.path.join(temp_dir, "temp_output.tex")
-            
-            with open(tex_file, "w") as file:
-                file.write(latex_table)
-            
-            # Compile LaTeX to PDF
+            # Copies the PDF the preview compiled from the same source, and only compiles if there is none
+            os.makedirs("temp", exist_ok=True)
             try:
-                pdf_temp_file = os.path.join(temp_dir, "temp_output.pdf")
-                run(["pdflatex", "-output-directory", temp_dir, tex_file], check=True)
-                
-                # Copy the compiled PDF to the user's chosen location
-                import shutil
-                shutil.copy(pdf_temp_file, file_path)
-                print(f"PDF file saved successfully to {file_path}")
-            except CalledProcessError as e:
-                print(f"Error compiling LaTeX to PDF: {e}")
+                self.invoice.write_pdf(file_path, self.render_cache, temp_dir="temp")
+                logger.info("PDF file saved to %s", file_path)
+            except (LatexCompileError, OSError) as e:
+                logger.error("Error compiling LaTeX to PDF: %s", e)
 
     def save_all(self):
-        """Save CSV, LaTeX, and PDF files."""
-        self.save_csv()
-        self.save_tex()
-        self.save_pdf()
-        print("All files saved successfully.")
+        """Save CSV, LaTeX, and PDF files next to each other, under one name and in one pass."""
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save All Files", "output", "All Formats (*.csv *.tex *.pdf)")
+        if file_path:
+            output_base, _ = split_extension(file_path)
+            os.makedirs("temp", exist_ok=True)
+            try:
+                written = self.invoice.export(output_base, self.render_cache, temp_dir="temp")
+                logger.info("Saved %s", ", ".join(written))
+            except (LatexCompileError, OSError) as e:
+                logger.error("Error saving files: %s", e)
+
+    def closeEvent(self, event):
+        self.preview_worker.shutdown()
+        self.discard_entry_filter()
+        self._index_builder.shutdown(wait=False, cancel_futures=True)
+        super().closeEvent(event)
 
     def save_files(self):
         """Legacy method - calls save_all for backward compatibility."""
         self.save_all()
 
 if __name__ == "__main__":
+    configure()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,412 @@
+"""Render invoices for local scripts and tools over HTTP.
+
+POST /invoice takes a JSON object and answers with the rendered file:
+
+    {
+        "ics": "BEGIN:VCALENDAR...",      one calendar, or a list of calendars to merge
+        "format": "pdf",                  "pdf" (default), "csv" or "tex"
+        "rate": 160,
+        "months": [1, "feb"],             month numbers or names (default: all)
+        "search": "",
+        "from": "2024-01-01", "to": "2024-06-30",
+        "config": {"name": "..."},        overrides of the personal and banking config
+        "table_mode": "auto",
+        "pdf_engine": "pdflatex"
+    }
+
+Requests are rendered by a bounded pool of worker processes that have
+their LaTeX format and modules loaded before the first request. At most
+--queue requests wait for a free worker; beyond that the service answers
+503 with Retry-After instead of queueing without limit. Every request is
+rendered in its own temporary directory. Rendered files are kept in an
+on-disk result cache shared by all requests, identical requests in
+flight are rendered once, and compiled PDFs go through the render cache
+shared with the app. GET /health reports the pool, queue and cache state.
+
+Calendar and config text is escaped before it goes into the LaTeX, and
+pdflatex runs without shell escape and may only read and write files in
+its working directory. The service has no authentication, so it should
+only listen on addresses that trusted callers can reach.
+
+Example:
+    python src/server.py --port 8765 --workers 4 --queue 16
+    curl --data @request.json http://127.0.0.1:8765/invoice -o invoice.pdf
+"""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from cli import FORMATS, parse_month, render_job
+from utils.calendar_cache import CalendarCache
+from utils.calendar_merge import load_calendars
+from utils.config import load_config, DEFAULT_CONFIG_PATH
+from utils.disk_cache import atomic_write, default_cache_dir, evict_lru, touch
+from utils.instrumentation import configure
+from utils.latex_compiler import LatexCompileError
+from utils.pdf_writer import NATIVE_ENGINE
+from utils.recurrence import entries_in_window
+
+CONTENT_TYPES = {
+    'pdf': "application/pdf",
+    'csv': "text/csv; charset=utf-8",
+    'tex': "application/x-tex; charset=utf-8",
+}
+TABLE_MODES = ("auto", "float", "longtable")
+PDF_ENGINES = ("pdflatex", NATIVE_ENGINE)
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+# Part of every result cache key; bump it when the rendered output changes for the same request
+RESULT_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+class RequestError(ValueError):
+    """Raised for a request that cannot be rendered as given."""
+
+
+class ServiceBusy(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+def parse_request(data, config_info):
+    """Validate a decoded request and return it in normal form, with defaults filled in.
+
+    The result only holds JSON types, so it can be hashed for the result
+    cache and sent to a worker process as is.
+    """
+    if not isinstance(data, dict):
+        raise RequestError("expected a JSON object")
+    ics = data.get('ics')
+    if isinstance(ics, str):
+        ics = [ics]
+    if not ics or not isinstance(ics, list) or not all(isinstance(text, str) for text in ics):
+        raise RequestError("'ics' must be a calendar or a list of calendars")
+
+    output_format = data.get('format', 'pdf')
+    if output_format not in FORMATS:
+        raise RequestError(f"'format' must be one of {', '.join(FORMATS)}")
+    try:
+        rate = float(data.get('rate', 160))
+        months = sorted({parse_month(str(month)) for month in data.get('months', range(1, 13))})
+        start = date.fromisoformat(data['from']).isoformat() if data.get('from') else None
+        end = date.fromisoformat(data['to']).isoformat() if data.get('to') else None
+    except (TypeError, ValueError, argparse.ArgumentTypeError) as e:
+        raise RequestError(str(e)) from e
+
+    if data.get('table_mode', 'auto') not in TABLE_MODES:
+        raise RequestError(f"'table_mode' must be one of {', '.join(TABLE_MODES)}")
+    if data.get('pdf_engine', 'pdflatex') not in PDF_ENGINES:
+        raise RequestError(f"'pdf_engine' must be one of {', '.join(PDF_ENGINES)}")
+    overrides = data.get('config', {})
+    if not isinstance(overrides, dict) or not set(overrides) <= set(config_info):
+        raise RequestError(f"'config' may only set {', '.join(config_info)}")
+
+    return {
+        'ics': ics,
+        'format': output_format,
+        'rate': rate,
+        'months': months,
+        'search': str(data.get('search', '')),
+        'from': start,
+        'to': end,
+        'config': {**config_info, **{key: str(value) for key, value in overrides.items()}},
+        'table_mode': data.get('table_mode', 'auto'),
+        'pdf_engine': data.get('pdf_engine', 'pdflatex'),
+    }
+
+
+def request_key(request):
+    canonical = json.dumps([RESULT_VERSION, request], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def render_request(request, work_root):
+    """Render a request from parse_request in a directory of its own and return the file contents."""
+    work_dir = tempfile.mkdtemp(prefix="request-", dir=work_root)
+    try:
+        calendar_paths = []
+        for i, text in enumerate(request['ics']):
+            calendar_paths.append(os.path.join(work_dir, f"calendar-{i}.ics"))
+            with open(calendar_paths[-1], "w", encoding="utf-8", newline="") as file:
+                file.write(text)
+        # Calendars are parsed like --merge in the CLI, with a parse cache that lives as long as the request
+        entries, recurrences = load_calendars(calendar_paths, CalendarCache(os.path.join(work_dir, "cache")),
+                                              max_workers=1)
+        start = date.fromisoformat(request['from']) if request['from'] else None
+        end = date.fromisoformat(request['to']) + timedelta(days=1) if request['to'] else None
+
+        job = {
+            'name': "invoice",
+            'entries': entries_in_window(entries, recurrences, start, end),
+            'output_dir': work_dir,
+            'formats': {request['format']},
+            'rate': request['rate'],
+            'months': request['months'],
+            'search': request['search'],
+            'split_months': False,
+            'compress_csv': False,
+            'skip_empty': False,
+            'table_mode': request['table_mode'],
+            'pdf_engine': request['pdf_engine'],
+            'config_info': request['config'],
+        }
+        output_path, = render_job(job)
+        with open(output_path, "rb") as file:
+            return file.read()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _start_worker():
+    # Load the heavy modules and build the LaTeX format before the first request arrives
+    import fitz  # noqa: F401  PyMuPDF
+    import cli
+    from utils.format_compiler import FormatCompiler
+    from utils.latex_writer import LATEX_PREAMBLE
+    from utils.render_cache import RenderCache
+
+    compiler = FormatCompiler()
+    cli._render_cache = RenderCache(compiler=compiler.compile)
+    if shutil.which("pdflatex"):
+        compiler.format_for(LATEX_PREAMBLE)
+
+
+def _ready():
+    pass
+
+
+class ResultCache:
+    """On-disk cache of rendered files, keyed by request_key.
+
+    Like the render cache, files are touched on every hit and the least
+    recently used ones are removed once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_cache_dir("results")
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, key, output_format):
+        return os.path.join(self.cache_dir, f"{key}.{output_format}")
+
+    def get(self, key, output_format):
+        """Return the cached file contents, or None on a miss."""
+        path = self.path(key, output_format)
+        if not touch(path):
+            return None
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            # Evicted between the touch and the read
+            return None
+
+    def put(self, key, output_format, data):
+        def write(tmp_path):
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+
+        atomic_write(self.path(key, output_format), write)
+        evict_lru(self.cache_dir, self.max_bytes, keep=key)
+
+
+class InvoiceService:
+    """Renders requests on a bounded pool of warm worker processes.
+
+    At most workers + queue_size renders are accepted at a time; submit
+    raises ServiceBusy beyond that. A slot is only given back once its
+    render finishes, even if the client stopped waiting for it. Requests
+    already in the result cache are answered without a worker, and a
+    request identical to one in flight waits for that render instead of
+    starting another.
+    """
+
+    def __init__(self, config_info, workers=None, queue_size=None, work_root=None, result_cache=None):
+        self.config_info = config_info
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = self.workers * 2 if queue_size is None else queue_size
+        self.work_root = work_root or tempfile.mkdtemp(prefix="caltotex-server-")
+        self.result_cache = result_cache or ResultCache()
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._executor = None
+        self.counts = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'rejected': 0, 'rendered': 0, 'failed': 0}
+
+    def start(self):
+        """Start the worker processes and wait until each has finished warming up."""
+        # Spawned workers start clean, which is safe from a process serving requests on threads
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_start_worker,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        # Processes are started as tasks arrive, so one task per worker starts all of them
+        for future in [self._executor.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+        logger.info("Started %d render workers", self.workers)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self.work_root, ignore_errors=True)
+
+    def render(self, request, timeout=None):
+        """Return (file contents, whether they came from the cache) for a request from parse_request."""
+        key = request_key(request)
+        with self._lock:
+            self.counts['requests'] += 1
+        cached = self.result_cache.get(key, request['format'])
+        if cached is not None:
+            with self._lock:
+                self.counts['cache_hits'] += 1
+            return cached, True
+        return self.submit(key, request).result(timeout), False
+
+    def submit(self, key, request):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                self.counts['coalesced'] += 1
+                return future
+            if not self._slots.acquire(blocking=False):
+                self.counts['rejected'] += 1
+                raise ServiceBusy()
+            future = self._executor.submit(render_request, request, self.work_root)
+            self._pending[key] = future
+        future.add_done_callback(lambda done: self._finished(key, request['format'], done))
+        return future
+
+    def _finished(self, key, output_format, future):
+        failed = future.cancelled() or future.exception() is not None
+        if not failed:
+            try:
+                self.result_cache.put(key, output_format, future.result())
+            except OSError:
+                logger.exception("Could not cache the result of request %s", key)
+        with self._lock:
+            self._pending.pop(key, None)
+            self.counts['failed' if failed else 'rendered'] += 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': len(self._pending),
+                **self.counts,
+            }
+
+
+class InvoiceRequestHandler(BaseHTTPRequestHandler):
+    """Maps HTTP requests onto the InvoiceService of the server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_error(404)
+            return
+        self._send(200, "application/json", json.dumps(self.server.service.stats()).encode("utf-8"))
+
+    def do_POST(self):
+        if self.path != "/invoice":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            # The body is left unread, so the connection cannot be reused
+            self.send_error(413, f"Requests are limited to {MAX_BODY_BYTES} bytes", headers={"Connection": "close"})
+            return
+
+        service = self.server.service
+        try:
+            data = json.loads(self.rfile.read(length))
+            request = parse_request(data, service.config_info)
+            output, cached = service.render(request, self.server.request_timeout)
+        except (json.JSONDecodeError, UnicodeDecodeError, RequestError) as e:
+            self.send_error(400, f"Bad request: {e}")
+        except ServiceBusy:
+            self.send_error(503, "All render workers are busy", headers={"Retry-After": "1"})
+        except FutureTimeout:
+            self.send_error(504, "Rendering did not finish in time")
+        except (LatexCompileError, ValueError) as e:
+            self.send_error(422, f"Could not render the invoice: {e}")
+        except Exception:
+            logger.exception("Error rendering request")
+            self.send_error(500)
+        else:
+            self._send(200, CONTENT_TYPES[request['format']], output,
+                       {"X-Cache": "hit" if cached else "miss",
+                        "Content-Disposition": f'attachment; filename="invoice.{request["format"]}"'})
+
+    def send_error(self, code, message=None, explain=None, headers=None):
+        body = json.dumps({'error': message or self.responses[code][0]}).encode("utf-8")
+        self._send(code, "application/json", body, headers)
+
+    def _send(self, code, content_type, body, headers=None):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+def make_server(service, host="127.0.0.1", port=8765, request_timeout=120):
+    """Return an HTTP server for service; call serve_forever() on it to start answering requests."""
+    server = ThreadingHTTPServer((host, port), InvoiceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.request_timeout = request_timeout
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve invoice rendering over HTTP on this machine.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on; there is no authentication (default: 127.0.0.1)")
+    parser.add_argument("-p", "--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="render worker processes (default: CPU count)")
+    parser.add_argument("-q", "--queue", type=int, help="requests waiting for a worker before 503 (default: 2 per worker)")
+    parser.add_argument("-t", "--timeout", type=float, default=120, help="seconds a request may take (default: 120)")
+    parser.add_argument("--cache-dir", help="result cache directory (default: the user cache directory)")
+    parser.add_argument("-c", "--config", default=DEFAULT_CONFIG_PATH, help="default personal and banking config file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    service = InvoiceService(load_config(args.config), max(1, args.workers), args.queue,
+                             result_cache=ResultCache(args.cache_dir))
+    service.start()
+    server = make_server(service, args.host, args.port, args.timeout)
+    print(f"Serving invoices on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    configure()
+    sys.exit(main())
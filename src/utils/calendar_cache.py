@@ -0,0 +1,198 @@
+from array import array
+from datetime import date, time
+import hashlib
+import os
+import pickle
+import zlib
+
+from utils.disk_cache import atomic_write, default_cache_dir, evict_lru, touch
+from utils.ics_parser import entry_from_block, is_recurrence_block, iter_vevent_blocks
+from utils.recurrence import RecurrenceSet
+
+# Bump whenever the parser output or the record layout changes, to invalidate old records
+CACHE_VERSION = 3
+
+
+class CalendarCache:
+    """Persistent cache of parsed calendar entries, keyed by file identity.
+
+    Each calendar gets one compressed record that stores its entries column
+    by column (dates and times as packed integer arrays), together with the
+    file's size, mtime and content hash and the byte offset and hash of the
+    part of the file that has been parsed. An unchanged file is loaded from
+    the record without reading the ICS data; a file that only had events
+    appended is parsed from the stored offset onwards. Recurring series are
+    stored as their raw event lines and expanded by the caller per window.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=100 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_cache_dir("calendars")
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def load_calendar(self, file_path):
+        """Return (single-event entries, RecurrenceSet) for file_path, reusing as much of the cached record as possible."""
+        entries, recurring = self.load_parsed(file_path)
+        return entries, RecurrenceSet(recurring)
+
+    def cached(self, file_path):
+        """Return (entries, recurring blocks) if the record of file_path is up to date, else None, without parsing."""
+        stat = os.stat(file_path)
+        record_path = self.record_path(file_path)
+        record = self._read_record(record_path)
+        if record and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            touch(record_path)
+            return decode_entries(record['columns']), record['recurring']
+        return None
+
+    def load_parsed(self, file_path):
+        """Return (single-event entries, raw blocks of the recurring events) for file_path.
+
+        Both are plain data, so they can be returned from a worker process.
+        """
+        stat = os.stat(file_path)
+        record_path = self.record_path(file_path)
+        record = self._read_record(record_path)
+
+        if record and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            touch(record_path)
+            return decode_entries(record['columns']), record['recurring']
+
+        offset = 0
+        entries = []
+        recurring = []
+        known_offset = record['parsed_offset'] if record else 0
+        prefix_hash, content_hash = _hash_file(file_path, known_offset)
+        if record and content_hash == record['content_hash']:
+            # Same content with a new mtime, nothing to parse
+            offset = record['parsed_offset']
+            entries = decode_entries(record['columns'])
+            recurring = record['recurring']
+        elif record and stat.st_size >= record['size'] and prefix_hash == record['prefix_hash']:
+            # Everything up to the last parsed event is unchanged, so only parse what follows it
+            offset = record['parsed_offset']
+            entries = decode_entries(record['columns'])
+            recurring = record['recurring']
+
+        parsed_offset = offset
+        for lines, end_offset in iter_vevent_blocks(file_path, offset):
+            parsed_offset = end_offset
+            if is_recurrence_block(lines):
+                recurring.append(lines)
+                continue
+            entry = entry_from_block(lines)
+            if entry is not None:
+                entries.append(entry)
+        entries.sort(key=lambda entry: entry['date'])
+
+        self._write_record(record_path, {
+            'version': CACHE_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_hash': content_hash,
+            'parsed_offset': parsed_offset,
+            'prefix_hash': prefix_hash if parsed_offset == known_offset else _hash_prefix(file_path, parsed_offset),
+            'columns': encode_entries(entries),
+            'recurring': recurring,
+        })
+        return entries, recurring
+
+    def record_path(self, file_path):
+        name = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.cal")
+
+    def invalidate(self, file_path):
+        """Drop the cached record for file_path, if there is one."""
+        try:
+            os.remove(self.record_path(file_path))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".cal"):
+                os.remove(entry.path)
+
+    def _read_record(self, record_path):
+        try:
+            with open(record_path, "rb") as file:
+                record = pickle.loads(zlib.decompress(file.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(record, dict) or record.get('version') != CACHE_VERSION:
+            return None
+        return record
+
+    def _write_record(self, record_path, record):
+        data = zlib.compress(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+
+        def write(tmp_path):
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+
+        atomic_write(record_path, write)
+        evict_lru(self.cache_dir, self.max_bytes, keep=os.path.basename(record_path))
+
+
+def _hash_file(file_path, prefix_length):
+    """Return (hash of the first prefix_length bytes, hash of the whole file) in one read."""
+    prefix = hashlib.sha256()
+    content = hashlib.sha256()
+    remaining = prefix_length
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            if remaining > 0:
+                prefix.update(chunk[:remaining])
+                remaining -= len(chunk)
+            content.update(chunk)
+    return prefix.hexdigest(), content.hexdigest()
+
+
+def _hash_prefix(file_path, length):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while length > 0:
+            chunk = file.read(min(length, 1024 * 1024))
+            if not chunk:
+                break
+            digest.update(chunk)
+            length -= len(chunk)
+    return digest.hexdigest()
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def encode_entries(entries):
+    """Pack entries into columns: integer arrays for dates and times, lists for text."""
+    return {
+        'date': array('l', (entry['date'].toordinal() for entry in entries)),
+        'start_time': array('l', (_seconds(entry['start_time']) for entry in entries)),
+        'end_time': array('l', (_seconds(entry['end_time']) for entry in entries)),
+        'summary': [str(entry['summary']) for entry in entries],
+        'description': [str(entry['description']) for entry in entries],
+        'uid': [entry['uid'] for entry in entries],
+        'sequence': array('l', (entry['sequence'] for entry in entries)),
+    }
+
+
+def decode_entries(columns):
+    def to_time(seconds):
+        return time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+    return [
+        {
+            'summary': summary,
+            'date': date.fromordinal(ordinal),
+            'start_time': to_time(start),
+            'end_time': to_time(end),
+            'description': description,
+            'entry_salary': 0,  # Placeholder, calculated later
+            'uid': uid,
+            'sequence': sequence,
+        }
+        for ordinal, start, end, summary, description, uid, sequence in zip(
+            columns['date'], columns['start_time'], columns['end_time'],
+            columns['summary'], columns['description'], columns['uid'], columns['sequence'])
+    ]
@@ -0,0 +1,123 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+from utils.calendar_cache import CalendarCache
+from utils.recurrence import RecurrenceSet
+
+
+# added, removed and changed are lists of entries (changed holds the new versions and
+# changed_from the old ones); old_positions maps every new entry to its old index, or -1
+CalendarDiff = namedtuple('CalendarDiff', ['added', 'removed', 'changed', 'changed_from', 'old_positions'])
+
+
+def _entry_key(entry):
+    # Occurrences of a series share the UID, so the start tells them apart
+    if entry.get('uid'):
+        return entry['uid'], entry['date'], entry['start_time']
+    return None, entry['date'], entry['start_time'], entry['end_time'], str(entry['summary'])
+
+
+def _entry_content(entry):
+    return (str(entry['summary']), entry['date'], entry['start_time'], entry['end_time'],
+            str(entry['description']), entry.get('sequence', 0))
+
+
+def diff_entries(old_entries, new_entries):
+    """Compare two versions of a calendar's entries by UID and occurrence start.
+
+    Returns a CalendarDiff; its old_positions let callers keep everything
+    they computed for unchanged entries.
+    """
+    old_by_key = {}
+    for position, entry in enumerate(old_entries):
+        old_by_key.setdefault(_entry_key(entry), []).append(position)
+
+    added, changed, changed_from, old_positions = [], [], [], []
+    for entry in new_entries:
+        positions = old_by_key.get(_entry_key(entry))
+        if not positions:
+            added.append(entry)
+            old_positions.append(-1)
+            continue
+        position = positions.pop(0)
+        old_entry = old_entries[position]
+        if _entry_content(old_entry) == _entry_content(entry):
+            old_positions.append(position)
+        else:
+            changed.append(entry)
+            changed_from.append(old_entry)
+            old_positions.append(-1)
+
+    removed = [old_entries[position] for positions in old_by_key.values() for position in positions]
+    return CalendarDiff(added, removed, changed, changed_from, old_positions)
+
+
+def merge_entries(entry_lists):
+    """Merge per-calendar entry lists into one date-sorted list without duplicate events.
+
+    Entries with the same UID are copies of one event, e.g. an invitation
+    that shows up in two calendars; the copy with the highest SEQUENCE is
+    kept, and the first one seen on a tie. Entries without a UID are never
+    treated as duplicates.
+    """
+    merged = []
+    by_uid = {}
+    for entries in entry_lists:
+        for entry in entries:
+            uid = entry.get('uid')
+            if not uid:
+                merged.append(entry)
+                continue
+            position = by_uid.get(uid)
+            if position is None:
+                by_uid[uid] = len(merged)
+                merged.append(entry)
+            elif entry['sequence'] > merged[position]['sequence']:
+                merged[position] = entry
+    merged.sort(key=lambda entry: entry['date'])
+    return merged
+
+
+def _load_parsed(cache_dir, file_path):
+    # Runs in a worker process, which opens the shared on-disk cache itself
+    return CalendarCache(cache_dir).load_parsed(file_path)
+
+
+def load_calendars(file_paths, calendar_cache=None, max_workers=None):
+    """Load several ICS files as one calendar and return (entries, RecurrenceSet).
+
+    Files whose cache record is up to date are read in this process. The
+    others are parsed in a pool of worker processes, one file per task, so
+    the load time scales with the number of cores rather than files. The
+    results are merged with merge_entries, and recurring series and
+    overrides are deduplicated by UID, RECURRENCE-ID and SEQUENCE.
+    """
+    calendar_cache = calendar_cache or CalendarCache()
+    results = {}
+    to_parse = []
+    for file_path in file_paths:
+        cached = calendar_cache.cached(file_path)
+        if cached is not None:
+            results[file_path] = cached
+        else:
+            to_parse.append(file_path)
+
+    workers = min(len(to_parse), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        # Not worth starting processes for
+        for file_path in to_parse:
+            results[file_path] = calendar_cache.load_parsed(file_path)
+    else:
+        # Spawned workers start clean, which is safe from a process running a Qt event loop
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {file_path: executor.submit(_load_parsed, calendar_cache.cache_dir, file_path)
+                       for file_path in to_parse}
+            for file_path, future in futures.items():
+                results[file_path] = future.result()
+
+    # Merge in the order the files were given, so ties resolve the same way on every load
+    entries = merge_entries(results[file_path][0] for file_path in file_paths)
+    recurrences = RecurrenceSet(block for file_path in file_paths for block in results[file_path][1])
+    return entries, recurrences
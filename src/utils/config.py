@@ -0,0 +1,42 @@
+import configparser
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config.txt')
+
+
+def load_config(config_path=DEFAULT_CONFIG_PATH):
+    """Load personal and banking information from config file."""
+    config = configparser.ConfigParser()
+
+    # Default values
+    default_config = {
+        'name': 'John Doe',
+        'address_line1': 'Street Address 123',
+        'address_line2': '12345 City Name',
+        'address_line3': 'Country',
+        'bank_name': 'Bank Name',
+        'clearing_number': '1234-5',
+        'account_number': '123 456 789-0',
+        'iban': 'XX00 0000 0000 0000 0000 0000',
+        'bic': 'XXXXXXXX'
+    }
+
+    try:
+        config.read(config_path)
+        return {
+            'name': config.get('Personal Information', 'name', fallback=default_config['name']),
+            'address_line1': config.get('Personal Information', 'address_line1', fallback=default_config['address_line1']),
+            'address_line2': config.get('Personal Information', 'address_line2', fallback=default_config['address_line2']),
+            'address_line3': config.get('Personal Information', 'address_line3', fallback=default_config['address_line3']),
+            'bank_name': config.get('Banking Information', 'bank_name', fallback=default_config['bank_name']),
+            'clearing_number': config.get('Banking Information', 'clearing_number', fallback=default_config['clearing_number']),
+            'account_number': config.get('Banking Information', 'account_number', fallback=default_config['account_number']),
+            'iban': config.get('Banking Information', 'iban', fallback=default_config['iban']),
+            'bic': config.get('Banking Information', 'bic', fallback=default_config['bic'])
+        }
+    except Exception as e:
+        logger.warning("Error loading config file: %s. Using default values.", e)
+        return default_config
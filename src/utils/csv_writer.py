@@ -1,12 +1,53 @@
 import csv
-from io import StringIO
+import gzip
+from itertools import islice
 
-def write_csv(entries, salary_per_hour):
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Date', 'Start Time', 'End Time', 'Salary Per Hour', 'Total Salary'])
+CSV_HEADER = ['Date', 'Start Time', 'End Time', 'Salary Per Hour', 'Total Salary']
 
+# Rows handed to the csv writer at a time, and the size of the file buffer they are written through
+CHUNK_ROWS = 1024
+BUFFER_SIZE = 1024 * 1024
+
+
+def csv_rows(entries, salary_per_hour):
+    """Yield the CSV row of each entry, one at a time."""
     for entry in entries:
-        writer.writerow([entry['date'], entry['start_time'], entry['end_time'], salary_per_hour, entry['entry_salary']])
+        yield [entry['date'], entry['start_time'], entry['end_time'], salary_per_hour, entry['entry_salary']]
+
+
+def write_csv_file(file_path, entries, salary_per_hour, totals=None, compress=None):
+    """Stream the CSV for entries straight to file_path and return the number of rows written.
+
+    entries may be any iterable, rows are formatted and written in chunks
+    of CHUNK_ROWS through a buffered file, so the CSV text is never held in
+    memory. totals is an optional (total hours, total salary) pair for the
+    totals line. The output is gzip-compressed when compress is True, or
+    when it is None and file_path ends in ".gz".
+    """
+    if compress is None:
+        compress = file_path.endswith(".gz")
+    if compress:
+        file = gzip.open(file_path, "wt", newline="", compresslevel=6)
+    else:
+        file = open(file_path, "w", newline="", buffering=BUFFER_SIZE)
+
+    rows_written = 0
+    with file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        rows = csv_rows(entries, salary_per_hour)
+        while True:
+            chunk = list(islice(rows, CHUNK_ROWS))
+            if not chunk:
+                break
+            writer.writerows(chunk)
+            rows_written += len(chunk)
+        if totals is not None:
+            total_hours, total_salary = totals
+            file.write(totals_line(total_hours, salary_per_hour, total_salary))
+    return rows_written
+
 
-    return output.getvalue()
\ No newline at end of file
+def totals_line(total_hours, salary_per_hour, total_salary):
+    """Return the totals line appended below the CSV rows."""
+    return f"\nTotal Hours,,,{total_hours:.2f},Salary Per Hour,,,{salary_per_hour},Total Salary,,,{total_salary}"
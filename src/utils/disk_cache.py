@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+
+def default_cache_dir(name):
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "caltotex", name)
+
+
+def atomic_write(path, write):
+    """Call write(tmp_path) and move the result to path, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=os.path.splitext(path)[1], dir=directory)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def touch(path):
+    """Mark path as recently used. Returns False if it does not exist."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def evict_lru(directory, max_bytes, keep=None):
+    """Delete least recently used files in directory until it fits in max_bytes.
+
+    Files whose name starts with keep, and hidden in-progress files, are
+    never removed.
+    """
+    files = []
+    total = 0
+    for entry in os.scandir(directory):
+        if not entry.is_file() or entry.name.startswith("."):
+            continue
+        stat = entry.stat()
+        files.append((stat.st_mtime, stat.st_size, entry.path, entry.name))
+        total += stat.st_size
+
+    files.sort()
+    for _, size, path, name in files:
+        if total <= max_bytes:
+            break
+        if keep and name.startswith(keep):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
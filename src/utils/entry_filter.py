@@ -0,0 +1,241 @@
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+
+class EntryFilter:
+    """Search and month filtering over an EntryStore without rescanning every entry.
+
+    Summaries and descriptions are lowercased once and deduplicated, since
+    recurring events share their text, so searches work on distinct texts.
+    Rows are bucketed by month once, and a month selection is the union of
+    its buckets. Text queries are answered from an n-gram index once
+    build_index has run, without testing any text; until then they fall
+    back to testing every distinct text, so a query never waits for the
+    index to be built. Results for recent queries are kept, and a query
+    that extends an earlier one only narrows the earlier result's rows.
+    """
+
+    def __init__(self, entry_store, cached_queries=32):
+        self.month = entry_store.month
+        text_ids = {}
+        # Summary and description joined by a separator no query can contain
+        self._text_id = np.fromiter(
+            (text_ids.setdefault(f"{entry.get('summary', '').lower()}\0{entry.get('description', '').lower()}",
+                                 len(text_ids))
+             for entry in entry_store.entries),
+            dtype=np.intp, count=len(entry_store.entries))
+        self._text = list(text_ids)
+        self._all_rows = np.arange(len(self._text_id), dtype=np.intp)
+
+        # A stable sort keeps the rows of each month bucket in order
+        by_month = np.argsort(self.month, kind="stable")
+        bounds = np.searchsorted(self.month[by_month], np.arange(1, 14))
+        self._month_buckets = {month: by_month[bounds[month - 1]:bounds[month]] for month in range(1, 13)}
+        self._month_key = None
+        self._month_rows = None
+        self._month_mask = None
+
+        self._index = None
+        self._cancel_index = threading.Event()
+        self._results = OrderedDict()
+        self._cached_queries = cached_queries
+
+    def filter(self, search_text, months):
+        """Return the sorted row indices matching search_text in any of the given month numbers."""
+        months = tuple(sorted(set(months)))
+        if not months:
+            return self._all_rows[:0]
+        query = search_text.lower()
+        if not query:
+            return self._rows_for(months)
+
+        key = (query, months)
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key]
+
+        hit = np.zeros(len(self._text), dtype=bool)
+        hit[self._matching_texts(query)] = True
+        rows = self._narrowest_cached(query, months)
+        if rows is None or 4 * len(rows) > len(self._all_rows):
+            # Past a quarter of the rows, one pass over all of them is cheaper than picking out the cached ones
+            matched = hit[self._text_id]
+            if len(months) < 12:
+                matched &= self._mask_for(months)
+            rows = np.flatnonzero(matched)
+        else:
+            rows = rows[hit[self._text_id[rows]]]
+
+        self._results[key] = rows
+        if len(self._results) > self._cached_queries:
+            self._results.popitem(last=False)
+        return rows
+
+    def search(self, search_text):
+        """Return the sorted row indices whose summary or description contains search_text."""
+        return self.filter(search_text, range(1, 13))
+
+    def build_index(self):
+        """Build the n-gram index. Safe to run on a background thread while filter() is in use."""
+        if self._index is None:
+            self._index = _NgramIndex.build(self._text, self._cancel_index)
+
+    def cancel_index(self):
+        """Stop a build_index that is still running; this filter keeps testing every text."""
+        self._cancel_index.set()
+
+    def _rows_for(self, months):
+        if len(months) == 12:
+            return self._all_rows
+        if self._month_key != months:
+            # Each bucket is sorted, which the stable sort's run merging picks up
+            self._month_rows = np.sort(np.concatenate([self._month_buckets[month] for month in months]),
+                                       kind="stable")
+            self._month_mask = np.zeros(len(self._all_rows), dtype=bool)
+            self._month_mask[self._month_rows] = True
+            self._month_key = months
+        return self._month_rows
+
+    def _mask_for(self, months):
+        self._rows_for(months)
+        return self._month_mask
+
+    def _narrowest_cached(self, query, months):
+        # Any row matching query also matches every substring of it
+        best = None
+        for (previous, previous_months), rows in self._results.items():
+            if previous_months == months and previous in query and (best is None or len(rows) < len(best)):
+                best = rows
+        return best
+
+    def _matching_texts(self, query):
+        if "\0" in query:
+            return []
+        index = self._index
+        if index is None:
+            return [text_id for text_id, text in enumerate(self._text) if query in text]
+        return index.matching_texts(query)
+
+
+class _NgramIndex:
+    """N-gram index over the deduplicated texts of an EntryFilter.
+
+    The texts are joined into one array of character codes. For one and
+    two character queries the index holds the ids of the texts that contain
+    each character and each pair. Longer queries start from the positions
+    of their rarest trigram in the joined texts and keep the positions
+    where the rest of the query's characters follow, so matches are exact
+    and no text is ever tested. The positions and texts of recent queries
+    are kept, and a query that contains one of them only checks its other
+    characters at those positions. Building the index is a handful of numpy
+    array operations, so running it on a background thread leaves the GIL
+    to the GUI most of the time.
+    """
+
+    def __init__(self, alphabet, codes, text_of, grams, cached_queries=32):
+        self._alphabet = alphabet
+        self._codes = codes
+        self._text_of = text_of
+        # (sorted keys, bounds, values) per gram length; values[bounds[i]:bounds[i + 1]] belong to keys[i]
+        self._grams = grams
+        self._occurrences = OrderedDict()
+        self._cached_queries = cached_queries
+
+    @classmethod
+    def build(cls, texts, cancel_event):
+        """Return the index of texts, or None if cancel_event was set while building it."""
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 1
+        codes = np.frombuffer(("\0".join(texts) + "\0").encode("utf-32-le"), dtype=np.uint32)
+        present = np.flatnonzero(np.bincount(codes))
+        size = len(present)
+        codes = np.arange(size, dtype=np.min_scalar_type(size))[np.searchsorted(present, codes)]
+        text_of = np.repeat(np.arange(len(texts), dtype=np.int32), lengths)
+
+        # Gram keys are base-size numbers; the smallest dtype that holds trigram keys keeps sorting fast
+        dtype = np.uint16 if size ** 3 <= 1 << 16 else np.uint32 if size ** 3 <= 1 << 32 else np.uint64
+        grams = {}
+        keys = codes.astype(dtype)
+        for length in (1, 2, 3):
+            if cancel_event.is_set():
+                return None
+            if length > 1:
+                keys = keys[:-1] * dtype(size) + codes[length - 1:]
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            if length < 3:
+                # Texts holding each gram; the positions of a gram are in text order, so duplicates are adjacent
+                values = text_of[order]
+                first = np.ones(len(values), dtype=bool)
+                first[1:] = (sorted_keys[1:] != sorted_keys[:-1]) | (values[1:] != values[:-1])
+                sorted_keys, values = sorted_keys[first], values[first]
+            else:
+                values = order.astype(np.int32) if len(codes) < 1 << 31 else order
+            starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+            grams[length] = (sorted_keys[starts], np.append(starts, len(sorted_keys)), values)
+
+        alphabet = {chr(code): position for position, code in enumerate(present.tolist())}
+        return cls(alphabet, codes, text_of, grams)
+
+    def matching_texts(self, query):
+        """Return the ids of the texts that contain query, in order and possibly repeated."""
+        query_codes = [self._alphabet.get(char) for char in query]
+        if None in query_codes:
+            return []
+        if len(query) < 3:
+            return self._postings(query_codes)
+        if query in self._occurrences:
+            self._occurrences.move_to_end(query)
+            return self._occurrences[query][1]
+
+        starts, text_ids, known = self._narrowest_cached(query)
+        if starts is None:
+            offset = min(range(len(query) - 2), key=lambda i: len(self._postings(query_codes[i:i + 3])))
+            starts = self._postings(query_codes[offset:offset + 3]).astype(np.int64) - offset
+            known = range(offset, offset + 3)
+            # Keep the query inside the joined texts, its first and last characters are checked below
+            in_range = (starts >= 0) & (starts <= len(self._codes) - len(query))
+            starts = starts[in_range]
+
+        # Check the rest of the query one character at a time, on fewer positions each time
+        for i, code in enumerate(query_codes):
+            if i in known or not len(starts):
+                continue
+            keep = self._codes[starts + i] == code
+            starts = starts[keep]
+            if text_ids is not None:
+                text_ids = text_ids[keep]
+        if text_ids is None:
+            text_ids = self._text_of[starts]
+
+        self._occurrences[query] = (starts, text_ids)
+        if len(self._occurrences) > self._cached_queries:
+            self._occurrences.popitem(last=False)
+        return text_ids
+
+    def _narrowest_cached(self, query):
+        # A query occurs wherever a cached query inside it occurs, shifted by where it sits in the query
+        best = None
+        for previous, (starts, text_ids) in self._occurrences.items():
+            # Of equally narrow ones, the longest leaves the fewest characters to check
+            if previous in query and (best is None or (len(starts), -len(previous)) < (len(best[1]), -len(best[0]))):
+                best = (previous, starts, text_ids)
+        if best is None:
+            return None, None, None
+        previous, starts, text_ids = best
+        offset = query.index(previous)
+        starts = starts - offset
+        # A shifted position outside the joined texts cannot match; those are cut before any lookup
+        in_range = (starts >= 0) & (starts <= len(self._codes) - len(query))
+        return starts[in_range], text_ids[in_range], range(offset, offset + len(previous))
+
+    def _postings(self, gram_codes):
+        keys, bounds, values = self._grams[len(gram_codes)]
+        key = 0
+        for code in gram_codes:
+            key = key * len(self._alphabet) + code
+        i = np.searchsorted(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return values[:0]
+        return values[bounds[i]:bounds[i + 1]]
@@ -0,0 +1,100 @@
+from collections import namedtuple
+import calendar
+
+import numpy as np
+import pandas as pd
+
+# Grand totals plus a {month name: (hours, salary)} mapping in invoice order
+Totals = namedtuple('Totals', ['hours', 'salary', 'months'])
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _month_and_hours(entries):
+    count = len(entries)
+    start_minutes = np.fromiter((_minutes(entry['start_time']) for entry in entries), dtype=np.int32, count=count)
+    end_minutes = np.fromiter((_minutes(entry['end_time']) for entry in entries), dtype=np.int32, count=count)
+    month = np.fromiter((entry['date'].month for entry in entries), dtype=np.int8, count=count)
+    return month, (end_minutes - start_minutes) / 60
+
+
+class EntryStore:
+    """Columnar store of parsed entries with precomputed hours and salary.
+
+    Durations are computed once when the store is built. Changing the hourly
+    rate is a single array multiply, and totals for a filter state (a row
+    index array) are computed with vectorized sums and kept until the
+    filter or the rate changes.
+    """
+
+    def __init__(self, entries, salary_per_hour=0, month=None, hours=None):
+        self.entries = entries
+        if month is None:
+            month, hours = _month_and_hours(entries)
+
+        self.frame = pd.DataFrame({
+            'month': month,
+            'month_name': pd.Categorical.from_codes(month - 1, categories=MONTH_NAMES),
+            'hours': hours,
+        })
+        self._totals_key = None
+        self._totals = None
+        self.set_salary_per_hour(salary_per_hour)
+
+    @classmethod
+    def from_diff(cls, store, entries, old_positions):
+        """Build a store for entries that reuses the rows of store for unchanged entries.
+
+        old_positions holds, for each entry, its row in store, or -1 for
+        added and changed entries; only those have their hours computed.
+        """
+        old_positions = np.asarray(old_positions, dtype=np.int64)
+        kept = old_positions >= 0
+        month = np.empty(len(entries), dtype=np.int8)
+        hours = np.empty(len(entries), dtype=np.float64)
+        month[kept] = store.month[old_positions[kept]]
+        hours[kept] = store.hours[old_positions[kept]]
+        new_rows = np.flatnonzero(~kept)
+        month[new_rows], hours[new_rows] = _month_and_hours([entries[i] for i in new_rows.tolist()])
+        return cls(entries, store.salary_per_hour, month, hours)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def month(self):
+        return self.frame['month'].to_numpy()
+
+    @property
+    def hours(self):
+        return self.frame['hours'].to_numpy()
+
+    @property
+    def salary(self):
+        return self.frame['salary'].to_numpy()
+
+    def set_salary_per_hour(self, salary_per_hour):
+        self.salary_per_hour = salary_per_hour
+        self.frame['salary'] = self.hours * salary_per_hour
+        self._totals_key = None
+
+    def totals(self, index=None):
+        """Return Totals for the rows in index (all rows if None), reusing the last result."""
+        key = None if index is None else index.tobytes()
+        if self._totals is not None and self._totals_key == (key, self.salary_per_hour):
+            return self._totals
+
+        frame = self.frame if index is None else self.frame.iloc[index]
+        # Entries are sorted by date, so first appearance is the invoice's month order
+        by_month = frame.groupby('month_name', sort=False, observed=True)[['hours', 'salary']].sum()
+        months = {
+            str(month): (float(row.hours), float(row.salary))
+            for month, row in zip(by_month.index, by_month.itertuples(index=False))
+        }
+        self._totals = Totals(float(frame['hours'].sum()), float(frame['salary'].sum()), months)
+        self._totals_key = (key, self.salary_per_hour)
+        return self._totals
@@ -0,0 +1,127 @@
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+COLUMNS = ("Summary", "Date", "Start Time", "End Time", "Hours", "Salary")
+DATE_COLUMN = 1
+NUMERIC_COLUMNS = (4, 5)
+
+# Rows added to the model per fetchMore call, as the view scrolls towards the end
+FETCH_ROWS = 500
+
+
+class EntryTableModel(QAbstractTableModel):
+    """Table model over the filtered rows of an EntryStore.
+
+    The model only holds the store and the list of row numbers in display
+    order. Cells are formatted when the view asks for them, which is only
+    for visible rows, and rows are handed to the view FETCH_ROWS at a time
+    through canFetchMore/fetchMore. A filter change swaps the row list and
+    resets the model; sorting reorders the row list and emits layoutChanged.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []
+        self._hours = None
+        self._salary = None
+        self._rows = []
+        self._fetched = 0
+        self._sort_column = DATE_COLUMN
+        self._sort_order = Qt.SortOrder.AscendingOrder
+
+    def set_rows(self, entry_store, index):
+        """Show the rows in index (an array of store rows), in the current sort order."""
+        self.beginResetModel()
+        self._entries = entry_store.entries
+        self._hours = entry_store.hours
+        self._salary = entry_store.salary
+        self._rows = self._sorted(index.tolist(), self._sort_column, self._sort_order)
+        self._fetched = min(len(self._rows), FETCH_ROWS)
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self._entries, self._hours, self._salary, self._rows, self._fetched = [], None, None, [], 0
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._fetched < len(self._rows)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(FETCH_ROWS, len(self._rows) - self._fetched)
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if column in NUMERIC_COLUMNS:
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+            return None
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+
+        row = self._rows[index.row()]
+        if column == 4:
+            return f"{self._hours[row]:.2f}"
+        if column == 5:
+            return f"{self._salary[row]:.2f}"
+        entry = self._entries[row]
+        if column == 0:
+            return str(entry['summary'])
+        return str(entry[('date', 'start_time', 'end_time')[column - 1]])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column, self._sort_order = column, order
+        if not self._rows:
+            return
+        self.layoutAboutToBeChanged.emit()
+        old_rows = self._rows
+        self._rows = self._sorted(old_rows, column, order)
+
+        # Keep the selection and current cell on the same entries
+        old_indexes = self.persistentIndexList()
+        if old_indexes:
+            new_positions = {row: position for position, row in enumerate(self._rows)}
+            new_indexes = []
+            for old in old_indexes:
+                position = new_positions[old_rows[old.row()]]
+                new_indexes.append(self.index(position, old.column()) if position < self._fetched else QModelIndex())
+            self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _sorted(self, rows, column, order):
+        entries = self._entries
+        if column == 0:
+            def key(row):
+                return str(entries[row]['summary']).lower()
+        elif column == DATE_COLUMN:
+            def key(row):
+                return entries[row]['date'], entries[row]['start_time']
+        elif column in (2, 3):
+            field = ('start_time', 'end_time')[column - 2]
+
+            def key(row):
+                return entries[row][field]
+        else:
+            values = self._hours if column == 4 else self._salary
+            key = values.__getitem__
+        # sorted is stable in both directions, so equal keys stay in date order
+        return sorted(rows, key=key, reverse=order == Qt.SortOrder.DescendingOrder)
@@ -0,0 +1,85 @@
+from subprocess import run, DEVNULL
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from utils.disk_cache import default_cache_dir
+from utils.latex_compiler import ENGINE_OPTIONS, compile_latex, engine_environment, LatexCompileError
+from utils.render_cache import engine_version
+
+BEGIN_DOCUMENT = "\\begin{document}"
+
+logger = logging.getLogger(__name__)
+
+
+class FormatCompiler:
+    """Compile LaTeX with its preamble loaded from a precompiled format file.
+
+    The first compile for a given preamble dumps it into a .fmt file with
+    `engine -ini`; later compiles load that format instead of re-reading the
+    document class and packages. Formats are named after a hash of the
+    preamble and the engine version, so changing the header builds a new
+    one, and they are kept on disk so the engine stays warm across runs.
+    Sources without a preamble, or whose format cannot be built, fall back
+    to a plain compile.
+    """
+
+    def __init__(self, format_dir=None):
+        self.format_dir = format_dir or default_cache_dir("formats")
+        self._failed = set()
+        self._lock = threading.Lock()
+        os.makedirs(self.format_dir, exist_ok=True)
+
+    def compile(self, latex_code, output_dir, jobname="output", engine="pdflatex", cancel_event=None):
+        """Compile latex_code like compile_latex, using a precompiled preamble when possible."""
+        preamble, separator, body = latex_code.partition(BEGIN_DOCUMENT)
+        format_file = self.format_for(preamble, engine) if separator else None
+        if format_file is None:
+            return compile_latex(latex_code, output_dir, jobname, engine, cancel_event)
+        return compile_latex(separator + body, output_dir, jobname, engine, cancel_event,
+                             format_file=format_file)
+
+    def format_for(self, preamble, engine="pdflatex"):
+        """Return the format path for preamble, dumping it first if needed, or None on failure."""
+        name = self.format_name(preamble, engine)
+        format_path = os.path.join(self.format_dir, name)
+        if os.path.exists(format_path + ".fmt"):
+            return format_path
+
+        with self._lock:
+            if name in self._failed:
+                return None
+            if not os.path.exists(format_path + ".fmt"):
+                try:
+                    self._dump_format(preamble, engine, name)
+                except (LatexCompileError, OSError) as e:
+                    logger.warning("Could not build LaTeX format, compiling without it: %s", e)
+                    self._failed.add(name)
+                    return None
+        return format_path
+
+    def format_name(self, preamble, engine="pdflatex"):
+        digest = hashlib.sha256(f"{engine}\0{engine_version(engine)}\0{preamble}".encode("utf-8"))
+        return f"preamble-{digest.hexdigest()[:16]}"
+
+    def _dump_format(self, preamble, engine, name):
+        # Build in a scratch directory and move the result into place, so
+        # other processes never load a half-written format
+        build_dir = tempfile.mkdtemp(prefix="format-", dir=os.path.abspath(self.format_dir))
+        try:
+            preamble_file = os.path.join(build_dir, f"{name}.tex")
+            with open(preamble_file, "w") as file:
+                file.write(preamble + "\\dump\n")
+
+            command = [engine, "-ini", *ENGINE_OPTIONS, f"-jobname={name}",
+                       "-output-directory", build_dir, f"&{engine}", os.path.basename(preamble_file)]
+            result = run(command, stdout=DEVNULL, stderr=DEVNULL, cwd=build_dir, env=engine_environment(build_dir))
+            built_format = os.path.join(build_dir, f"{name}.fmt")
+            if result.returncode != 0 or not os.path.exists(built_format):
+                raise LatexCompileError(f"{engine} -ini exited with status {result.returncode}")
+            os.replace(built_format, os.path.join(self.format_dir, f"{name}.fmt"))
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
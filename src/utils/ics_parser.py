@@ -1,33 +1,159 @@
-from icalendar import Calendar
-from datetime import datetime
-
-def parse_ics(file_path):
-    entries = []
-    with open(file_path, 'r') as file:
-        calendar = Calendar.from_ical(file.read())
-        for component in calendar.walk():
-            if component.name == "VEVENT":
-                start = component.get('dtstart').dt
-                end = component.get('dtend')
-                summary = component.get('summary', '')
-                description = component.get('description', '')
-                # Handle missing 'dtend' by using 'dtstart' as fallback
-                if end:
-                    end = end.dt
-                else:
-                    end = start  # Assume the event has no end time
-
-                # Ensure 'start' and 'end' are datetime objects
-                if isinstance(start, datetime) and isinstance(end, datetime):
-                    entries.append({
-                        'summary': summary,
-                        'date': start.date(),
-                        'start_time': start.time(),
-                        'end_time': end.time(),
-                        'description': description,
-                        'entry_salary': 0  # Placeholder, calculated later
-                    })
+from datetime import date, datetime
+import re
+
+# Date part of a raw DTSTART line, e.g. "DTSTART;TZID=Europe/Berlin:20231010T090000". Quoted
+# parameter values may contain colons, e.g. Outlook's TZID="(UTC+01:00) Amsterdam, Berlin"
+DTSTART_PATTERN = re.compile(r'DTSTART(?:;(?:[^:"]|"[^"]*")*)?:(\d{4})(\d{2})(\d{2})(T?)', re.IGNORECASE)
+
+# Properties of events that are part of a recurring series and are expanded by utils.recurrence
+RECURRENCE_PROPERTIES = ('RRULE', 'RDATE', 'RECURRENCE-ID')
+
+
+def iter_vevent_blocks(file_path, offset=0):
+    """Yield the unfolded content lines of each VEVENT in the file, one event at a time.
+
+    The file is read line by line starting at byte offset, so only the event
+    being tokenized is ever held in memory. Each item is a (lines, end_offset)
+    tuple, where end_offset is the byte offset just past the event's END:VEVENT.
+    """
+    block = None
+    logical = None
+    position = offset
+    with open(file_path, 'rb') as file:
+        file.seek(offset)
+        for raw_line in file:
+            line = raw_line.decode('utf-8', errors='replace').rstrip('\r\n')
+            if line[:1] in (' ', '\t') and logical is not None:
+                # Folded continuation of the previous content line
+                logical += line[1:]
+            else:
+                if logical is not None:
+                    block = _consume_line(block, logical)
+                    if block is not None and block[-1] == 'END:VEVENT':
+                        yield block, position
+                        block = None
+                logical = line
+            position += len(raw_line)
+
+        if logical is not None:
+            block = _consume_line(block, logical)
+            if block is not None and block[-1] == 'END:VEVENT':
+                yield block, position
+
+
+def _consume_line(block, line):
+    if block is None:
+        return [line] if line.upper() == 'BEGIN:VEVENT' else None
+    if line.upper() == 'END:VEVENT':
+        line = 'END:VEVENT'
+    block.append(line)
+    return block
+
+
+def _raw_start_date(lines):
+    """Read the start date straight from the DTSTART line, without building the event."""
+    for line in lines:
+        match = DTSTART_PATTERN.match(line)
+        if match:
+            year, month, day, time_marker = match.groups()
+            return date(int(year), int(month), int(day)), bool(time_marker)
+    return None, False
+
+
+def entry_from_event(component):
+    """Turn a VEVENT component into an entry dict, or None if it has no start and end time."""
+    start = component.get('dtstart').dt
+    end = component.get('dtend')
+    summary = component.get('summary', '')
+    description = component.get('description', '')
+    # Handle missing 'dtend' by using 'dtstart' as fallback
+    if end:
+        end = end.dt
+    else:
+        end = start  # Assume the event has no end time
+
+    # Ensure 'start' and 'end' are datetime objects
+    if not (isinstance(start, datetime) and isinstance(end, datetime)):
+        return None
+    return {
+        'summary': summary,
+        'date': start.date(),
+        'start_time': start.time(),
+        'end_time': end.time(),
+        'description': description,
+        'entry_salary': 0,  # Placeholder, calculated later
+        # Identify the event across calendars, so copies of it can be deduplicated
+        'uid': str(component.get('uid', '')),
+        'sequence': int(component.get('sequence', 0)),
+    }
+
+
+def entry_from_block(lines, start=None, end=None):
+    """Parse one tokenized VEVENT block into an entry dict, or None if it yields no entry.
+
+    When start and/or end dates are given, events whose start date falls
+    outside [start, end) are rejected from their raw DTSTART line before any
+    parsing happens, as are all-day events, which never produce an entry.
+    The window is checked again on the parsed entry, for DTSTART lines the
+    raw pattern does not recognise.
+    """
+    start_date, has_time = _raw_start_date(lines)
+    if start_date is not None:
+        if not has_time:
+            return None
+        if (start is not None and start_date < start) or (end is not None and start_date >= end):
+            return None
+
+    from icalendar import Event  # Imported on first use, it is slow to load
+
+    component = Event.from_ical('\r\n'.join(lines))
+    if component.get('dtstart') is None:
+        return None
+    entry = entry_from_event(component)
+    if entry is not None and ((start is not None and entry['date'] < start)
+                              or (end is not None and entry['date'] >= end)):
+        return None
+    return entry
+
+
+def is_recurrence_block(lines):
+    """Return True for a VEVENT that defines a recurring series or overrides one of its occurrences."""
+    return any(line.upper().startswith(RECURRENCE_PROPERTIES) for line in lines)
+
+
+def iter_ics_entries(file_path, start=None, end=None):
+    """Stream entries from an ICS file as a generator, parsing one event at a time.
+
+    Recurring series are expanded once all events have been read, over
+    [start, end), or from the first event's year through the current year
+    when no window is given.
+    """
+    from utils.recurrence import RecurrenceSet, expansion_years
+
+    recurrences = RecurrenceSet()
+    first = last = None
+    for lines, _ in iter_vevent_blocks(file_path):
+        if is_recurrence_block(lines):
+            recurrences.add_block(lines)
+            continue
+        entry = entry_from_block(lines, start, end)
+        if entry is not None:
+            first = entry if first is None or entry['date'] < first['date'] else first
+            last = entry if last is None or entry['date'] > last['date'] else last
+            yield entry
+
+    if not recurrences:
+        return
+    years = expansion_years([entry for entry in (first, last) if entry is not None], recurrences)
+    window_start = start or (date(years.start, 1, 1) if years else None)
+    window_end = end or (date(years.stop, 1, 1) if years else None)
+    if window_start is not None and window_end is not None:
+        yield from recurrences.occurrences(window_start, window_end)
+
+
+def parse_ics(file_path, start=None, end=None):
+    entries = list(iter_ics_entries(file_path, start, end))
 
     # Sort entries by date
     entries.sort(key=lambda entry: entry['date'])
-    return entries
\ No newline at end of file
+    return entries
@@ -0,0 +1,117 @@
+"""Logging setup, timed pipeline stages and opt-in profiling.
+
+Everything is configured from environment variables, so it can be
+switched on for a production run without code changes:
+
+    CALTOTEX_LOG_LEVEL=DEBUG      log level for the caltotex loggers (default WARNING)
+    CALTOTEX_TIMINGS=stages.json  write per-stage latencies as JSON on exit
+    CALTOTEX_PROFILE=run.prof     profile the whole run with cProfile and write the stats on exit
+"""
+from contextlib import contextmanager
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Loggers of the application modules, set to CALTOTEX_LOG_LEVEL by configure()
+LOGGERS = ("__main__", "main", "cli", "server", "utils")
+
+
+class StageTimings:
+    """Latency statistics per pipeline stage, safe to update from worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            stats = self._stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+            stats['count'] += 1
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['last'] = seconds
+
+    @contextmanager
+    def span(self, stage, **details):
+        """Time the enclosed block as one run of stage and log it at DEBUG level."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(stage, elapsed)
+            logger.debug("%s took %.1f ms%s", stage, elapsed * 1000,
+                         "".join(f" {key}={value}" for key, value in details.items()))
+
+    def last(self, stage):
+        """Return the latest latency of stage in seconds, or None if it has not run."""
+        with self._lock:
+            stats = self._stages.get(stage)
+            return stats['last'] if stats else None
+
+    def summary(self):
+        """Return {stage: {count, last_ms, mean_ms, max_ms}} for every stage that has run."""
+        with self._lock:
+            return {
+                stage: {
+                    'count': stats['count'],
+                    'last_ms': stats['last'] * 1000,
+                    'mean_ms': stats['total'] / stats['count'] * 1000,
+                    'max_ms': stats['max'] * 1000,
+                }
+                for stage, stats in self._stages.items()
+            }
+
+    def dump_json(self, path):
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+# Shared by the GUI and the preview worker; batch workers only log their spans
+timings = StageTimings()
+span = timings.span
+
+
+def configure(environ=os.environ):
+    """Set up logging, the JSON timings dump and profiling from the CALTOTEX_* variables."""
+    level = environ.get("CALTOTEX_LOG_LEVEL", "WARNING").upper()
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    for name in LOGGERS:
+        logging.getLogger(name).setLevel(level)
+
+    timings_path = environ.get("CALTOTEX_TIMINGS")
+    if timings_path:
+        atexit.register(timings.dump_json, timings_path)
+
+    profile_path = environ.get("CALTOTEX_PROFILE")
+    if profile_path:
+        start_profiling(profile_path)
+
+
+def start_profiling(path):
+    """Profile the rest of the run with cProfile and write the stats to path on exit.
+
+    Only the calling thread is profiled; open the result with
+    `python -m pstats path` or a viewer such as snakeviz.
+    """
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def finish():
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info("Wrote profile to %s", path)
+
+    atexit.register(finish)
+    return profiler
@@ -0,0 +1,97 @@
+from functools import cached_property
+import os
+import shutil
+import tempfile
+
+from utils.csv_writer import write_csv_file
+from utils.instrumentation import span
+from utils.latex_writer import generate_latex_table
+from utils.pdf_writer import NATIVE_ENGINE, render_native
+
+EXPORT_FORMATS = ('csv', 'tex', 'pdf')
+
+
+class Invoice:
+    """The invoice for one filter state: its rows, totals, rate and personal details.
+
+    An Invoice is built once per filter state and never changed, so every
+    output rendered from it agrees: the LaTeX source is generated on first
+    use and shared by the LaTeX preview, the PDF preview and every export.
+    It keeps the store's entries and salary column with the filtered row
+    numbers, so building one copies nothing; entry dicts with their salary
+    are only made by records(), where rows are formatted.
+    """
+
+    def __init__(self, entry_store, index, config_info, table_mode="auto"):
+        """index is the array of store rows on the invoice, or None for all rows."""
+        self._entries = entry_store.entries
+        # set_salary_per_hour replaces the salary column, so this one stays at the invoice's rate
+        self._salary = entry_store.salary
+        self.index = range(len(entry_store)) if index is None else index
+        self.totals = entry_store.totals(index)
+        self.salary_per_hour = entry_store.salary_per_hour
+        self.config_info = dict(config_info)
+        self.table_mode = table_mode
+
+    def __len__(self):
+        return len(self.index)
+
+    def records(self):
+        """Yield the entry dict of each invoice row with entry_salary filled in."""
+        entries, salary = self._entries, self._salary
+        rows = self.index if isinstance(self.index, range) else self.index.tolist()
+        for row in rows:
+            yield dict(entries[row], entry_salary=float(salary[row]))
+
+    @cached_property
+    def latex(self):
+        with span("latex", entries=len(self)):
+            return generate_latex_table(list(self.records()), self.totals.salary, self.totals.hours,
+                                        self.salary_per_hour, self.config_info, self.totals.months, self.table_mode)
+
+    def write_csv(self, file_path):
+        write_csv_file(file_path, self.records(), self.salary_per_hour, (self.totals.hours, self.totals.salary))
+
+    def write_tex(self, file_path):
+        with open(file_path, "w") as file:
+            file.write(self.latex)
+
+    def write_pdf(self, file_path, render_cache, temp_dir=None, engine="pdflatex"):
+        """Copy the compiled PDF to file_path, compiling only if this LaTeX is not in the render cache yet.
+
+        engine NATIVE_ENGINE lays the invoice out with PyMuPDF instead of compiling it.
+        """
+        work_dir = tempfile.mkdtemp(prefix="save-", dir=temp_dir)
+        try:
+            with span("compile", engine=engine):
+                if engine == NATIVE_ENGINE:
+                    pdf_file = render_native(self, render_cache, work_dir)
+                else:
+                    pdf_file = render_cache.compile(self.latex, work_dir, engine=engine)
+            # copyfile, not copy: the cache file is private to this user, the export should not be
+            shutil.copyfile(pdf_file, file_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def export(self, output_base, render_cache, formats=EXPORT_FORMATS, compress_csv=False, temp_dir=None,
+               engine="pdflatex"):
+        """Write output_base.csv, .tex and .pdf (as selected by formats) in one pass and return their paths."""
+        written = []
+        if 'csv' in formats:
+            csv_path = output_base + (".csv.gz" if compress_csv else ".csv")
+            self.write_csv(csv_path)
+            written.append(csv_path)
+        if 'tex' in formats:
+            self.write_tex(output_base + ".tex")
+            written.append(output_base + ".tex")
+        if 'pdf' in formats:
+            self.write_pdf(output_base + ".pdf", render_cache, temp_dir, engine)
+            written.append(output_base + ".pdf")
+        return written
+
+
+def split_extension(file_path):
+    """Split a chosen export path into its base and extension, treating ".csv.gz" as one extension."""
+    if file_path.endswith(".csv.gz"):
+        return file_path[:-len(".csv.gz")], ".csv.gz"
+    return os.path.splitext(file_path)
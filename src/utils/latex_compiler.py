@@ -0,0 +1,62 @@
+import os
+from subprocess import Popen, DEVNULL, TimeoutExpired
+
+
+class LatexCompileError(Exception):
+    """Raised when the LaTeX engine does not produce a PDF."""
+
+
+class CompileCancelled(Exception):
+    """Raised when a compile is cancelled before the engine finishes."""
+
+
+# Invoices can contain text from other people's calendars, so shell escape stays off
+ENGINE_OPTIONS = ["-no-shell-escape", "-interaction=nonstopmode", "-halt-on-error"]
+
+
+def engine_environment(work_dir):
+    """Return the environment for an engine run in work_dir.
+
+    kpathsea's paranoid mode keeps \\input, \\openin and \\openout from
+    touching files outside work_dir, dot files or parent directories.
+    """
+    return dict(os.environ, openin_any="p", openout_any="p", TEXMFOUTPUT=work_dir)
+
+
+def compile_latex(latex_code, output_dir, jobname="output", engine="pdflatex", cancel_event=None,
+                  format_file=None):
+    """Compile LaTeX source in output_dir and return the path of the PDF.
+
+    The engine runs as a child process. If cancel_event (a threading.Event)
+    is set while it is running, the process is killed and CompileCancelled
+    is raised instead of waiting for an outdated result. format_file names a
+    precompiled format (without the .fmt suffix) to load instead of the
+    engine's default one.
+    """
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    tex_file = os.path.join(output_dir, f"{jobname}.tex")
+    pdf_file = os.path.join(output_dir, f"{jobname}.pdf")
+
+    with open(tex_file, "w") as file:
+        file.write(latex_code)
+
+    command = [engine, *ENGINE_OPTIONS, "-output-directory", output_dir]
+    if format_file:
+        command.append(f"-fmt={os.path.abspath(format_file)}")
+    # Run in output_dir with a relative file name, which paranoid mode accepts as input
+    command.append(f"{jobname}.tex")
+    process = Popen(command, stdout=DEVNULL, stderr=DEVNULL, cwd=output_dir, env=engine_environment(output_dir))
+    while True:
+        try:
+            returncode = process.wait(timeout=0.05)
+            break
+        except TimeoutExpired:
+            if cancel_event is not None and cancel_event.is_set():
+                process.kill()
+                process.wait()
+                raise CompileCancelled(f"{engine} run for {tex_file} was cancelled")
+
+    if returncode != 0 or not os.path.exists(pdf_file):
+        raise LatexCompileError(f"{engine} exited with status {returncode}, see {jobname}.log in {output_dir}")
+    return pdf_file
@@ -0,0 +1,195 @@
+from functools import lru_cache
+import calendar
+
+# The preamble never depends on the entries, so compile backends can precompile it
+LATEX_PREAMBLE = (
+    "\\documentclass{article}\n"
+    "\\usepackage[utf8]{inputenc}\n"
+    "\\usepackage{geometry}\n"
+    "\\usepackage{longtable}\n"
+    "\\geometry{a4paper, margin=1in}\n"
+)
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+
+# Table rows that fit under the title and address blocks of the first page, where a float table that
+# cannot break has to fit: of the 698pt of text height, the blocks take about 145pt and the float
+# spacing and caption about 45pt, leaving about 41 rows of 12.4pt, less a small margin
+FLOAT_TABLE_ROWS = 38
+
+COLUMN_HEADINGS = (
+    "\\textbf{Summary} & \\textbf{Date} & \\textbf{Start Time} & \\textbf{End Time} & \\textbf{Salary} \\\\\n"
+)
+
+FLOAT_TABLE_HEADER = (
+    "\\begin{table}[h!]\n"
+    "\\centering\n"
+    "\\begin{tabular}{|l|l|l|l|l|}\n"
+    "\\hline\n"
+    + COLUMN_HEADINGS
+    + "\\hline\n"
+)
+FLOAT_TABLE_FOOTER = "\\end{tabular}\n\\caption{Invoice Details}\n\\end{table}\n"
+
+# Headings are repeated at the top of every page and a note is added at the bottom of every page but the last
+LONGTABLE_HEADER = (
+    "\\begin{longtable}{|l|l|l|l|l|}\n"
+    "\\hline\n"
+    + COLUMN_HEADINGS
+    + "\\hline\n"
+    "\\endfirsthead\n"
+    "\\hline\n"
+    + COLUMN_HEADINGS
+    + "\\hline\n"
+    "\\endhead\n"
+    "\\multicolumn{5}{r}{\\textit{Continued on next page}} \\\\\n"
+    "\\endfoot\n"
+    "\\endlastfoot\n"
+)
+LONGTABLE_FOOTER = "\\caption{Invoice Details}\n\\end{longtable}\n"
+
+# Text from calendars and config files is set literally; a stray & or \input must not become LaTeX
+LATEX_ESCAPES = str.maketrans({
+    "\\": "\\textbackslash{}",
+    "&": "\\&",
+    "%": "\\%",
+    "$": "\\$",
+    "#": "\\#",
+    "_": "\\_",
+    "{": "\\{",
+    "}": "\\}",
+    "~": "\\textasciitilde{}",
+    "^": "\\textasciicircum{}",
+    "\n": " ",
+    "\r": " ",
+})
+
+EMPTY_TABLE = (
+    "\\multicolumn{5}{|c|}{No entries available} \\\\\n"
+    "\\hline\n"
+)
+
+
+def escape_latex(text):
+    """Return text with every LaTeX special character escaped, on a single line."""
+    return str(text).translate(LATEX_ESCAPES)
+
+
+def generate_latex_table(entries, total_salary, total_hours, salary_per_hour, config_info, month_totals=None,
+                         table_mode="auto"):
+    """Build the complete LaTeX invoice document for the given entries.
+
+    month_totals optionally maps month names to precomputed (hours, salary)
+    totals, so they are not summed again row by row. table_mode is "float"
+    for a single-page table, "longtable" for a table that breaks across
+    pages, or "auto" to use a longtable once the table has more than
+    FLOAT_TABLE_ROWS rows, counting month headings and totals. The document
+    is assembled from a list of parts in one join, and each month's block
+    comes from render_month_block, which caches it, so re-filtering only
+    renders the months whose rows changed.
+    """
+    # Group entries by month
+    grouped_entries = {}
+    for entry in entries:
+        month = MONTH_NAMES[entry['date'].month - 1]
+        grouped_entries.setdefault(month, []).append(entry)
+
+    if table_mode == "auto":
+        # Column headings and grand total, plus a heading and a subtotal per month
+        table_rows = len(entries) + 2 * len(grouped_entries) + 2
+        table_mode = "longtable" if table_rows > FLOAT_TABLE_ROWS else "float"
+    if table_mode == "longtable":
+        table_header, table_footer = LONGTABLE_HEADER, LONGTABLE_FOOTER
+    else:
+        table_header, table_footer = FLOAT_TABLE_HEADER, FLOAT_TABLE_FOOTER
+
+    parts = [
+        LATEX_PREAMBLE,
+        "\\begin{document}\n",
+        "\\begin{center}{\\LARGE \\textbf{Salary Invoice}}\\end{center}\n",
+        "\\vspace{0.5cm}\n",
+        "\\noindent\n",
+        address_block(config_info['name'], config_info['address_line1'], config_info['address_line2'],
+                      config_info['address_line3']),
+        "\\hfill\n",
+        banking_block(config_info['bank_name'], config_info['clearing_number'], config_info['account_number'],
+                      config_info['iban'], config_info['bic']),
+        "\\vspace{1cm}\n",
+        table_header,
+    ]
+
+    if not entries:
+        parts += [EMPTY_TABLE, table_footer, "\\end{document}"]
+        return "".join(parts)
+
+    for month, month_entries in grouped_entries.items():
+        if month_totals is not None:
+            month_total_hours, month_total_salary = month_totals[month]
+        else:
+            month_total_hours = sum((entry['end_time'].hour - entry['start_time'].hour) +
+                                    (entry['end_time'].minute - entry['start_time'].minute) / 60
+                                    for entry in month_entries)
+            month_total_salary = sum(entry['entry_salary'] for entry in month_entries)
+
+        rows = tuple(
+            (escape_latex(entry['summary']), entry['date'], entry['start_time'], entry['end_time'], entry['entry_salary'])
+            for entry in month_entries
+        )
+        parts.append(render_month_block(month, rows, month_total_hours, month_total_salary))
+
+    parts += [
+        f"\\hline\n\\multicolumn{{2}}{{|r|}}{{\\textbf{{Total Hours:}} {total_hours:.2f}}} & "
+        f"\\multicolumn{{1}}{{r|}}{{\\textbf{{Salary Per Hour:}} {salary_per_hour:.2f}}} & "
+        f"\\multicolumn{{2}}{{r|}}{{\\textbf{{Total Salary:}} {total_salary:.2f}}} \\\\\n"
+        "\\hline\n",
+        table_footer,
+        "\\end{document}",
+    ]
+    return "".join(parts)
+
+
+@lru_cache(maxsize=256)
+def render_month_block(month, rows, month_total_hours, month_total_salary):
+    """Render one month's table rows and subtotal.
+
+    rows is a tuple of (summary, date, start time, end time, salary) tuples,
+    so the cache key covers every value printed in the block, including the
+    salaries that depend on the hourly rate.
+    """
+    parts = [f"\\multicolumn{{5}}{{|c|}}{{\\textbf{{{month}}}}} \\\\ \n\\hline\n"]
+    parts += [
+        f"{summary} & {date} & {start_time} & {end_time} & {salary:.2f} \\\\\n"
+        for summary, date, start_time, end_time, salary in rows
+    ]
+    parts.append(
+        f"\\hline\n\\multicolumn{{3}}{{|r|}}{{\\textbf{{Total for {month}:}}}} & "
+        f"\\textbf{{{month_total_hours:.2f} hours}} & \\textbf{{{month_total_salary:.2f}}} \\\\ \n"
+        "\\hline\n"
+    )
+    return "".join(parts)
+
+
+def address_block(name, line1, line2, line3):
+    name, line1, line2, line3 = map(escape_latex, (name, line1, line2, line3))
+    return (
+        "\\begin{minipage}[t]{0.45\\textwidth}\n"
+        f"{{{name}}}\\\\\n"
+        f"{line1}\\\\\n"
+        f"{line2}\\\\\n"
+        f"{line3}\\\\\n"
+        "\\end{minipage}\n"
+    )
+
+
+def banking_block(bank_name, clearing_number, account_number, iban, bic):
+    bank_name, clearing_number, account_number, iban, bic = map(
+        escape_latex, (bank_name, clearing_number, account_number, iban, bic))
+    return (
+        "\\begin{minipage}[t]{0.45\\textwidth}\n"
+        f"{bank_name}\\\\\n"
+        f"Clearing number: {clearing_number}\\\\\n"
+        f"Account number: {account_number}\\\\\n"
+        f"IBAN: {iban}\\\\\n"
+        f"BIC: {bic}\\\\\n"
+        "\\end{minipage}\n"
+    )
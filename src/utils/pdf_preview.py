@@ -0,0 +1,135 @@
+from PyQt6.QtWidgets import QScrollArea, QWidget, QVBoxLayout, QLabel
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from collections import OrderedDict
+
+from utils.instrumentation import span
+from utils.pdf_writer import FITZ_LOCK
+
+
+class PdfPreview(QScrollArea):
+    """Scrollable preview of every page of a PDF, rendered in memory.
+
+    Pages are laid out as placeholders sized to the widget width and only
+    rendered once they scroll into view, at a resolution that matches the
+    widget width and screen scaling. PyMuPDF pixmaps are wrapped straight
+    into QImages, and rendered pages are kept in an LRU cache keyed by
+    document, page and width, so switching back to a previous document or
+    scrolling back up does not render again.
+    """
+
+    # Emitted with the number of pages rendered after each render pass that drew something
+    pages_rendered = pyqtSignal(int)
+
+    def __init__(self, cache_pages=32, parent=None):
+        super().__init__(parent)
+        self.setWidgetResizable(True)
+        self.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+
+        self._container = QWidget()
+        self._layout = QVBoxLayout(self._container)
+        self._layout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
+        self._layout.setSpacing(8)
+        self.setWidget(self._container)
+
+        self._message = QLabel("PDF Preview will appear here.")
+        self._message.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._layout.addWidget(self._message)
+
+        self._doc = None
+        self._pdf_path = None
+        self._page_sizes = []
+        self._labels = []
+        self._rendered_widths = []
+        self._layout_width = None
+        self._cache = OrderedDict()
+        self._cache_pages = cache_pages
+
+        self.verticalScrollBar().valueChanged.connect(self._render_visible)
+
+    def set_document(self, pdf_path):
+        """Show pdf_path, keeping the scroll position if the page count is unchanged."""
+        import fitz  # PyMuPDF, imported on first use since it is slow to load
+
+        # The preview worker may be laying out the next invoice with PyMuPDF meanwhile
+        with FITZ_LOCK:
+            if self._doc is not None:
+                self._doc.close()
+            self._doc = fitz.open(pdf_path)
+            self._page_sizes = [(page.rect.width, page.rect.height) for page in self._doc]
+        self._pdf_path = pdf_path
+        self._message.hide()
+
+        while len(self._labels) > len(self._page_sizes):
+            self._labels.pop().deleteLater()
+        while len(self._labels) < len(self._page_sizes):
+            label = QLabel()
+            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            label.setStyleSheet("background: white;")
+            self._layout.addWidget(label)
+            self._labels.append(label)
+
+        self._layout_width = None
+        self._relayout()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._relayout()
+
+    def _page_width(self):
+        margins = self._layout.contentsMargins()
+        return max(100, self.viewport().width() - margins.left() - margins.right())
+
+    def _relayout(self):
+        width = self._page_width()
+        if width == self._layout_width:
+            return
+        self._layout_width = width
+        for label, (page_width, page_height) in zip(self._labels, self._page_sizes):
+            label.setFixedSize(width, round(width * page_height / page_width))
+        self._rendered_widths = [None] * len(self._labels)
+        # Render once the layout has placed the resized labels
+        QTimer.singleShot(0, self._render_visible)
+
+    def _render_visible(self):
+        if self._doc is None:
+            return
+        # Render the pages in view plus a viewport's worth above and below
+        top = self.verticalScrollBar().value() - self.viewport().height()
+        bottom = top + 3 * self.viewport().height()
+        width = self._layout_width
+        pages = [
+            page_number for page_number, label in enumerate(self._labels)
+            if self._rendered_widths[page_number] != width
+            and not (label.geometry().bottom() < top or label.geometry().top() > bottom)
+        ]
+        if not pages:
+            return
+        with span("render", pages=len(pages)):
+            for page_number in pages:
+                self._labels[page_number].setPixmap(self._page_pixmap(page_number, width))
+                self._rendered_widths[page_number] = width
+        self.pages_rendered.emit(len(pages))
+
+    def _page_pixmap(self, page_number, width):
+        ratio = self.devicePixelRatioF()
+        key = (self._pdf_path, page_number, round(width * ratio))
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+        else:
+            import fitz  # PyMuPDF
+
+            with FITZ_LOCK:
+                page = self._doc[page_number]
+                zoom = width * ratio / page.rect.width
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                # copy() detaches the image from the pixmap's buffer, which PyMuPDF frees later
+                image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888).copy()
+            self._cache[key] = image
+            if len(self._cache) > self._cache_pages:
+                self._cache.popitem(last=False)
+
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(ratio)
+        return pixmap
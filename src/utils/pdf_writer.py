@@ -0,0 +1,313 @@
+"""Lay out the invoice directly with PyMuPDF, as a fast alternative to pdflatex.
+
+The layout follows generate_latex_table: title, address and banking
+blocks, then the ruled table with a heading row, one block per month with
+its subtotal, the grand total row and the caption. Long tables continue
+on the next page under a repeated heading row. Rendering takes
+milliseconds and needs no TeX installation, so it is meant for the
+interactive preview, while saved PDFs still go through pdflatex.
+
+PyMuPDF does not support use from several threads, so every call into it
+in this process, here and in the preview widget, holds FITZ_LOCK. The
+lock is only held for the calls themselves, not the layout around them,
+so the preview keeps drawing pages while a long invoice is laid out on
+the worker thread.
+"""
+from collections import namedtuple
+from functools import lru_cache
+import os
+import threading
+
+from utils.latex_writer import MONTH_NAMES
+
+NATIVE_ENGINE = "pymupdf"
+
+# Held around every PyMuPDF call in the process, including the shared fitz.Font objects below
+FITZ_LOCK = threading.RLock()
+
+# A4 with the 1in margins of the LaTeX geometry
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89
+MARGIN = 72
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+FONT, BOLD_FONT, ITALIC_FONT = "helv", "hebo", "heit"
+FONT_SIZE = 10
+TITLE_SIZE = 17.28
+LINE_HEIGHT = 12
+ROW_HEIGHT = 15
+CELL_PADDING = 6
+RULE_WIDTH = 0.4
+
+COLUMN_HEADINGS = ("Summary", "Date", "Start Time", "End Time", "Salary")
+
+# One cell of a table row: the columns it spans, its text and how it is set
+Cell = namedtuple('Cell', ['first', 'last', 'text', 'align', 'bold'])
+# rule_above and rule_below draw an \hline over the whole table width
+Row = namedtuple('Row', ['cells', 'rule_above', 'rule_below'])
+
+
+def invoice_rows(entries, total_salary, total_hours, salary_per_hour, month_totals=None):
+    """Return the table rows below the heading row, in the same order and format as the LaTeX table."""
+    if not entries:
+        return [Row([Cell(0, 4, "No entries available", "center", False)], False, True)]
+
+    grouped_entries = {}
+    for entry in entries:
+        grouped_entries.setdefault(MONTH_NAMES[entry['date'].month - 1], []).append(entry)
+
+    rows = []
+    for month, month_entries in grouped_entries.items():
+        if month_totals is not None:
+            month_total_hours, month_total_salary = month_totals[month]
+        else:
+            month_total_hours = sum((entry['end_time'].hour - entry['start_time'].hour) +
+                                    (entry['end_time'].minute - entry['start_time'].minute) / 60
+                                    for entry in month_entries)
+            month_total_salary = sum(entry['entry_salary'] for entry in month_entries)
+
+        rows.append(Row([Cell(0, 4, month, "center", True)], False, True))
+        rows += [
+            Row([Cell(0, 0, str(entry['summary']), "left", False), Cell(1, 1, str(entry['date']), "left", False),
+                 Cell(2, 2, str(entry['start_time']), "left", False), Cell(3, 3, str(entry['end_time']), "left", False),
+                 Cell(4, 4, f"{entry['entry_salary']:.2f}", "left", False)], False, False)
+            for entry in month_entries
+        ]
+        rows.append(Row([Cell(0, 2, f"Total for {month}:", "right", True),
+                         Cell(3, 3, f"{month_total_hours:.2f} hours", "left", True),
+                         Cell(4, 4, f"{month_total_salary:.2f}", "left", True)], True, True))
+
+    rows.append(Row([Cell(0, 1, f"Total Hours: {total_hours:.2f}", "right", True),
+                     Cell(2, 2, f"Salary Per Hour: {salary_per_hour:.2f}", "right", True),
+                     Cell(3, 4, f"Total Salary: {total_salary:.2f}", "right", True)], True, True))
+    return rows
+
+
+# Glyph advances per font and character, measured once: PyMuPDF's own text
+# measuring goes through a Python call per character. Widths of whole strings
+# are cached as well, since dates, times and salaries repeat from row to row
+_advances = {}
+
+
+def _encodable(text):
+    # The base 14 fonts are set in WinAnsiEncoding, anything outside it becomes "?"
+    return text.encode("cp1252", "replace").decode("cp1252")
+
+
+@lru_cache(maxsize=8192)
+def _string_width(text, font=FONT, size=FONT_SIZE):
+    import fitz  # PyMuPDF
+
+    with FITZ_LOCK:
+        advances = _advances.get(font)
+        if advances is None:
+            advances = _advances[font] = {'font': fitz.Font(font)}
+        width = 0.0
+        for char in _encodable(text):
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = advances['font'].glyph_advance(ord(char))
+            width += advance
+    return width * size
+
+
+def _text_width(text, bold=False):
+    return _string_width(text, BOLD_FONT if bold else FONT)
+
+
+def _pdf_string(text):
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def column_widths(heading, rows):
+    """Size the columns to their content like LaTeX does, widening the last column of too narrow spans."""
+    widths = [0.0] * len(COLUMN_HEADINGS)
+    for row in [heading] + rows:
+        for cell in row.cells:
+            if cell.first == cell.last:
+                widths[cell.first] = max(widths[cell.first], _text_width(cell.text, cell.bold) + 2 * CELL_PADDING)
+    for row in [heading] + rows:
+        for cell in row.cells:
+            needed = _text_width(cell.text, cell.bold) + 2 * CELL_PADDING
+            spanned = sum(widths[cell.first:cell.last + 1])
+            if needed > spanned:
+                widths[cell.last] += needed - spanned
+
+    # Give up summary width first if the table is wider than the text block; summaries are cut to fit
+    overflow = sum(widths) - TEXT_WIDTH
+    if overflow > 0:
+        widths[0] = max(widths[0] - overflow, 4 * CELL_PADDING)
+    return widths
+
+
+def _fit(text, width, bold):
+    if _text_width(text, bold) <= width:
+        return text
+    while text and _text_width(text + "...", bold) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _join_rules(rules):
+    """Merge rules that continue one another on the same line and return them as (x0, y0, x1, y1)."""
+    joined = []
+    horizontal = sorted((y0, x0, x1) for x0, y0, x1, y1 in rules if y0 == y1)
+    vertical = sorted((x0, y0, y1) for x0, y0, x1, y1 in rules if x0 == x1 and y0 != y1)
+    for lines, to_points in ((horizontal, lambda y, x0, x1: (x0, y, x1, y)),
+                             (vertical, lambda x, y0, y1: (x, y0, x, y1))):
+        current = None
+        for axis, start, end in lines:
+            if current and current[0] == axis and start <= current[2]:
+                current[2] = max(current[2], end)
+                continue
+            if current:
+                joined.append(to_points(*current))
+            current = [axis, start, end]
+        if current:
+            joined.append(to_points(*current))
+    return joined
+
+
+class _Layout:
+    """Draws onto the pages of a document, keeping track of the current page and line.
+
+    The page content is written as one PDF content stream per page instead
+    of through Page.insert_text and Page.draw_line, which look up fonts and
+    rewrite the page contents on every call. Adjoining rules are joined
+    into one line before they are drawn.
+    """
+
+    def __init__(self, doc, widths):
+        self.doc = doc
+        self.widths = widths
+        self.left = MARGIN + max(0.0, (TEXT_WIDTH - sum(widths)) / 2)
+        self.edges = [self.left]
+        for width in widths:
+            self.edges.append(self.edges[-1] + width)
+        self.page = None
+        self.y = MARGIN
+        self.new_page()
+
+    def new_page(self):
+        self.finish_page()
+        with FITZ_LOCK:
+            self.page = self.doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        self.content = []
+        self.rules = set()
+        self.y = MARGIN
+        number = str(len(self.doc))
+        self.text(number, PAGE_WIDTH / 2 - _text_width(number) / 2, PAGE_HEIGHT - MARGIN / 2)
+
+    def finish_page(self):
+        if self.page is None:
+            return
+        # PDF coordinates grow upwards from the bottom of the page
+        self.content.append(f"q {RULE_WIDTH:g} w")
+        for x0, y0, x1, y1 in _join_rules(self.rules):
+            self.content.append(f"{x0:.2f} {PAGE_HEIGHT - y0:.2f} m {x1:.2f} {PAGE_HEIGHT - y1:.2f} l")
+        self.content.append("S Q")
+
+        with FITZ_LOCK:
+            for font in (FONT, BOLD_FONT, ITALIC_FONT):
+                self.page.insert_font(fontname=font)
+            xref = self.doc.get_new_xref()
+            self.doc.update_object(xref, "<<>>")
+            self.doc.update_stream(xref, "\n".join(self.content).encode("cp1252"))
+            self.doc.xref_set_key(self.page.xref, "Contents", f"{xref} 0 R")
+        self.page = None
+
+    def text(self, text, x, baseline, font=FONT, size=FONT_SIZE):
+        self.content.append(f"BT /{font} {size:g} Tf {x:.2f} {PAGE_HEIGHT - baseline:.2f} Td "
+                            f"{_pdf_string(_encodable(text))} Tj ET")
+
+    def rule(self, x0, y0, x1, y1):
+        self.rules.add((round(x0, 2), round(y0, 2), round(x1, 2), round(y1, 2)))
+
+    def row(self, row):
+        top, bottom = self.y, self.y + ROW_HEIGHT
+        baseline = top + (ROW_HEIGHT + FONT_SIZE * 0.7) / 2
+        if row.rule_above:
+            self.rule(self.edges[0], top, self.edges[-1], top)
+        self.rule(self.edges[0], top, self.edges[0], bottom)
+        for cell in row.cells:
+            x0, x1 = self.edges[cell.first], self.edges[cell.last + 1]
+            font = BOLD_FONT if cell.bold else FONT
+            text = _fit(cell.text, x1 - x0 - 2 * CELL_PADDING, cell.bold)
+            width = _text_width(text, cell.bold)
+            if cell.align == "right":
+                x = x1 - CELL_PADDING - width
+            elif cell.align == "center":
+                x = (x0 + x1 - width) / 2
+            else:
+                x = x0 + CELL_PADDING
+            self.text(text, x, baseline, font)
+            self.rule(x1, top, x1, bottom)
+        if row.rule_below:
+            self.rule(self.edges[0], bottom, self.edges[-1], bottom)
+        self.y = bottom
+
+    def fits(self, rows=1):
+        # Keep room for the "Continued on next page" note under the last row
+        return self.y + (rows + 1) * ROW_HEIGHT <= PAGE_HEIGHT - MARGIN
+
+
+def write_invoice_pdf(pdf_path, entries, total_salary, total_hours, salary_per_hour, config_info,
+                      month_totals=None):
+    """Write the invoice to pdf_path with PyMuPDF and return the path.
+
+    Takes the same invoice data as generate_latex_table.
+    """
+    import fitz  # PyMuPDF
+
+    heading = Row([Cell(i, i, title, "left", True) for i, title in enumerate(COLUMN_HEADINGS)], True, True)
+    rows = invoice_rows(entries, total_salary, total_hours, salary_per_hour, month_totals)
+
+    with FITZ_LOCK:
+        doc = fitz.open()
+    layout = _Layout(doc, column_widths(heading, rows))
+
+    title = "Salary Invoice"
+    title_width = _string_width(title, BOLD_FONT, TITLE_SIZE)
+    layout.text(title, (PAGE_WIDTH - title_width) / 2, layout.y + TITLE_SIZE, BOLD_FONT, TITLE_SIZE)
+    layout.y += TITLE_SIZE + 6 + 14  # Title line, then \vspace{0.5cm}
+
+    address = [config_info['name'], config_info['address_line1'], config_info['address_line2'],
+               config_info['address_line3']]
+    banking = [config_info['bank_name'], f"Clearing number: {config_info['clearing_number']}",
+               f"Account number: {config_info['account_number']}", f"IBAN: {config_info['iban']}",
+               f"BIC: {config_info['bic']}"]
+    banking_left = MARGIN + TEXT_WIDTH * 0.55
+    for i, line in enumerate(address):
+        layout.text(str(line), MARGIN, layout.y + FONT_SIZE + i * LINE_HEIGHT)
+    for i, line in enumerate(banking):
+        layout.text(str(line), banking_left, layout.y + FONT_SIZE + i * LINE_HEIGHT)
+    layout.y += max(len(address), len(banking)) * LINE_HEIGHT + 28  # Blocks, then \vspace{1cm}
+
+    layout.row(heading)
+    for row in rows:
+        if not layout.fits():
+            note = "Continued on next page"
+            layout.text(note, layout.edges[-1] - _string_width(note, ITALIC_FONT),
+                        layout.y + ROW_HEIGHT - 4, ITALIC_FONT)
+            layout.new_page()
+            layout.row(heading)
+        layout.row(row)
+
+    caption = "Table 1: Invoice Details"
+    layout.text(caption, (layout.edges[0] + layout.edges[-1] - _text_width(caption)) / 2, layout.y + 10 + FONT_SIZE)
+    layout.finish_page()
+
+    with FITZ_LOCK:
+        doc.save(pdf_path, garbage=1, deflate=True)
+        doc.close()
+    return pdf_path
+
+
+def render_native(invoice, render_cache, work_dir):
+    """Return a PDF of invoice laid out by PyMuPDF, from render_cache when it was rendered before."""
+    import fitz  # PyMuPDF
+
+    key = render_cache.key(invoice.latex, NATIVE_ENGINE, version=fitz.VersionBind)
+    pdf_path = os.path.join(work_dir, "preview.pdf")
+    return render_cache.render(key, lambda: write_invoice_pdf(
+        pdf_path, list(invoice.records()), invoice.totals.salary, invoice.totals.hours, invoice.salary_per_hour,
+        invoice.config_info, invoice.totals.months))
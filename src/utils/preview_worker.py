@@ -0,0 +1,102 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import tempfile
+import threading
+
+from utils.instrumentation import span
+from utils.latex_compiler import CompileCancelled, LatexCompileError
+from utils.pdf_writer import NATIVE_ENGINE, render_native
+
+
+class PreviewWorker(QObject):
+    """Debounce preview requests and render the latest invoice off the GUI thread.
+
+    Every request bumps a generation counter. A compile that is still running
+    when a newer request arrives is killed, and results from older
+    generations are dropped, so only the latest finished PDF is emitted.
+    engine is "pdflatex" to compile the invoice's LaTeX, or NATIVE_ENGINE to
+    lay it out with PyMuPDF in milliseconds. Either way the PDF goes through
+    the shared RenderCache, so an invoice rendered before is served from disk.
+    Native layouts run on the worker too; pdf_writer.FITZ_LOCK keeps them
+    from using PyMuPDF at the same time as the preview widget.
+    """
+
+    pdf_ready = pyqtSignal(str)
+    compile_failed = pyqtSignal(str)
+
+    # Internal signals, emitted from the worker thread and delivered on the GUI thread
+    _finished = pyqtSignal(int, str)
+    _failed = pyqtSignal(int, str)
+
+    def __init__(self, render_cache, temp_dir="temp", delay_ms=300, engine="pdflatex", parent=None):
+        super().__init__(parent)
+        self.render_cache = render_cache
+        self.engine = engine
+        self.temp_dir = temp_dir
+        self._generation = 0
+        self._pending = None
+        self._cancel_event = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._start_compile)
+
+        self._finished.connect(self._on_finished)
+        self._failed.connect(self._on_failed)
+
+    def request(self, invoice):
+        """Schedule a render of invoice once the input has settled."""
+        self._generation += 1
+        self._pending = invoice
+        if self._cancel_event is not None:
+            self._cancel_event.set()  # Whatever is compiling now is already out of date
+        self._timer.start()
+
+    def shutdown(self):
+        """Cancel pending work and stop the worker thread."""
+        self._timer.stop()
+        self._pending = None
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start_compile(self):
+        if self._pending is None:
+            return
+        invoice, self._pending = self._pending, None
+        self._cancel_event = threading.Event()
+        self._executor.submit(self._compile, invoice, self.engine, self._generation, self._cancel_event)
+
+    def _compile(self, invoice, engine, generation, cancel_event):
+        # Runs on the worker thread; each job gets its own directory so jobs never share files
+        if cancel_event.is_set():
+            return
+        os.makedirs(self.temp_dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix="preview-", dir=self.temp_dir)
+        try:
+            with span("compile", engine=engine):
+                if engine == NATIVE_ENGINE:
+                    pdf_path = render_native(invoice, self.render_cache, work_dir)
+                else:
+                    pdf_path = self.render_cache.compile(invoice.latex, work_dir, engine=engine,
+                                                         cancel_event=cancel_event)
+        except CompileCancelled:
+            return
+        except (LatexCompileError, OSError, RuntimeError, ValueError) as e:
+            self._failed.emit(generation, str(e))
+            return
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        self._finished.emit(generation, pdf_path)
+
+    def _on_finished(self, generation, pdf_path):
+        if generation == self._generation:
+            self.pdf_ready.emit(pdf_path)
+
+    def _on_failed(self, generation, message):
+        if generation == self._generation:
+            self.compile_failed.emit(message)
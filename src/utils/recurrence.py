@@ -0,0 +1,235 @@
+from datetime import date, datetime, time, timedelta
+
+from utils.ics_parser import entry_from_event
+
+
+def _values(component, name):
+    """Return the datetimes or dates of a possibly repeated list property such as EXDATE.
+
+    PERIOD values, which RDATE allows, come back as (start, end or duration) tuples.
+    """
+    prop = component.get(name)
+    if prop is None:
+        return []
+    props = prop if isinstance(prop, list) else [prop]
+    return [value.dt for item in props for value in item.dts]
+
+
+def _wall_time(value, tzinfo):
+    """Express a datetime as naive wall-clock time in the series' time zone."""
+    if value.tzinfo is not None and tzinfo is not None:
+        value = value.astimezone(tzinfo)
+    return value.replace(tzinfo=None)
+
+
+class RecurringSeries:
+    """One recurring event: its RRULE/RDATE/EXDATE set plus overridden occurrences.
+
+    Occurrences are expanded in the wall-clock time of the series' start, so
+    a weekly 09:00 meeting stays at 09:00 across daylight saving changes.
+    They are only generated for the date window that is asked for, and the
+    entries for each window are kept, so asking again costs a lookup.
+    """
+
+    def __init__(self, component, overrides):
+        from dateutil.rrule import rruleset, rrulestr
+
+        start = component.get('dtstart').dt
+        end = component.get('dtend')
+        duration = component.get('duration')
+        self.uid = str(component.get('uid', ''))
+        self.sequence = int(component.get('sequence', 0))
+        self.summary = component.get('summary', '')
+        self.description = component.get('description', '')
+        self.tzinfo = start.tzinfo if isinstance(start, datetime) else None
+        # All-day series never produce entries, like single all-day events
+        self.timed = isinstance(start, datetime)
+        self.start = _wall_time(start, self.tzinfo) if self.timed else datetime.combine(start, time.min)
+        if end is not None and isinstance(end.dt, datetime) and self.timed:
+            self.duration = _wall_time(end.dt, self.tzinfo) - self.start
+        elif duration is not None:
+            self.duration = duration.dt
+        else:
+            self.duration = timedelta(0)
+
+        self.rules = rruleset()
+        rrules = component.get('rrule')
+        for rrule in rrules if isinstance(rrules, list) else [rrules] if rrules is not None else []:
+            rule = rrulestr(rrule.to_ical().decode(), dtstart=self.start, ignoretz=True)
+            until = rrule.get('UNTIL')
+            if until:
+                until = until[0]
+                if isinstance(until, datetime):
+                    rule = rule.replace(until=_wall_time(until, self.tzinfo))
+                else:
+                    rule = rule.replace(until=datetime.combine(until, time.max))
+            self.rules.rrule(rule)
+        # Occurrences added as PERIOD values run for their own duration
+        self.durations = {}
+        for value in _values(component, 'rdate'):
+            occurrence = self._occurrence_start(value)
+            self.rules.rdate(occurrence)
+            if isinstance(value, tuple):
+                period_end = value[1]
+                if isinstance(period_end, timedelta):
+                    self.durations[occurrence] = period_end
+                else:
+                    self.durations[occurrence] = self._occurrence_start(period_end) - occurrence
+        for value in _values(component, 'exdate'):
+            self.rules.exdate(self._occurrence_start(value))
+
+        # Keyed by the raw RECURRENCE-ID values, which are only compared with occurrences in expansion
+        self.overrides = overrides
+        self._expanded = {}
+
+    def _occurrence_start(self, value):
+        """Turn a DATE, DATE-TIME or PERIOD value into the start of an occurrence in wall-clock time."""
+        if isinstance(value, tuple):
+            value = value[0]
+        if isinstance(value, datetime):
+            return _wall_time(value, self.tzinfo)
+        return datetime.combine(value, self.start.time())
+
+    def invalidate(self):
+        self._expanded.clear()
+
+    def occurrences(self, start, end):
+        """Return entries for the occurrences whose date falls in [start, end)."""
+        key = (start, end)
+        entries = self._expanded.get(key)
+        if entries is not None:
+            return entries
+
+        entries = []
+        if self.timed:
+            overridden = {self._occurrence_start(recurrence_id) for recurrence_id in self.overrides}
+            after = datetime.combine(start, time.min)
+            before = datetime.combine(end, time.min)
+            for occurrence in self.rules.between(after, before, inc=True):
+                if occurrence >= before or occurrence in overridden:
+                    continue
+                occurrence_end = occurrence + self.durations.get(occurrence, self.duration)
+                entries.append({
+                    'summary': self.summary,
+                    'date': occurrence.date(),
+                    'start_time': occurrence.time(),
+                    'end_time': occurrence_end.time(),
+                    'description': self.description,
+                    'entry_salary': 0,  # Placeholder, calculated later
+                    'uid': self.uid,
+                    'sequence': self.sequence,
+                })
+
+        # Moved or edited occurrences, wherever they ended up; cancelled ones are None
+        entries += [
+            entry for entry in self.overrides.values()
+            if entry is not None and start <= entry['date'] < end
+        ]
+        self._expanded[key] = entries
+        return entries
+
+
+class RecurrenceSet:
+    """The recurring series of one calendar, expanded lazily per date window.
+
+    Blocks are added as raw VEVENT lines, in any order: masters with an
+    RRULE or RDATE, and occurrence overrides with a RECURRENCE-ID.
+    Overrides whose master is not in the calendar are treated as single
+    events. When the same series or override is added more than once, for
+    example from several calendars, the copy with the highest SEQUENCE wins.
+    """
+
+    def __init__(self, blocks=()):
+        self.blocks = []
+        self._series = {}
+        self._overrides = {}
+        self._override_sequences = {}
+        for lines in blocks:
+            self.add_block(lines)
+
+    def __bool__(self):
+        return bool(self.blocks)
+
+    def add_block(self, lines):
+        from icalendar import Event
+
+        component = Event.from_ical('\r\n'.join(lines))
+        if component.get('dtstart') is None:
+            return
+        self.blocks.append(lines)
+        uid = str(component.get('uid', ''))
+        sequence = int(component.get('sequence', 0))
+        overrides = self._overrides.setdefault(uid, {})
+
+        recurrence_id = component.get('recurrence-id')
+        if recurrence_id is None:
+            if uid in self._series and self._series[uid].sequence > sequence:
+                return
+            self._series[uid] = RecurringSeries(component, overrides)
+            return
+
+        # Key the override by its raw RECURRENCE-ID; the master may not be added yet, or come from another
+        # calendar, so it is only put in the master's wall-clock time when occurrences are expanded.
+        # Zoned values for the same instant compare equal, whatever their time zone.
+        master = self._series.get(uid)
+        original = recurrence_id.dt
+        if self._override_sequences.get((uid, original), -1) > sequence:
+            return
+        self._override_sequences[(uid, original)] = sequence
+        cancelled = str(component.get('status', '')).upper() == 'CANCELLED'
+        overrides[original] = None if cancelled else entry_from_event(component)
+        if master is not None:
+            master.invalidate()
+
+    def occurrences(self, start, end):
+        """Return entries for every occurrence dated in [start, end), expanding only that window."""
+        entries = []
+        for series in self._series.values():
+            entries += series.occurrences(start, end)
+        for uid, overrides in self._overrides.items():
+            if uid in self._series:
+                continue
+            entries += [entry for entry in overrides.values()
+                        if entry is not None and start <= entry['date'] < end]
+        return entries
+
+    def occurrences_in_months(self, years, months):
+        """Return entries for the given month numbers of each year, one cached window per month."""
+        entries = []
+        for year in years:
+            for month in months:
+                start = date(year, month, 1)
+                end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+                entries += self.occurrences(start, end)
+        return entries
+
+    def first_year(self):
+        years = [series.start.year for series in self._series.values()]
+        return min(years) if years else None
+
+
+def expansion_years(entries, recurrences):
+    """Years to expand open-ended series over: from the calendar's first event to this year or its last event."""
+    years = [entry['date'].year for entry in entries[:1] + entries[-1:]]
+    first_series_year = recurrences.first_year()
+    if first_series_year is not None:
+        years.append(first_series_year)
+    if not years:
+        return range(0)
+    return range(min(years), max(years + [date.today().year]) + 1)
+
+
+def entries_in_window(entries, recurrences, start=None, end=None):
+    """Return the entries dated in [start, end) plus every occurrence in that window, sorted by date.
+
+    Open ends are taken from expansion_years, like parse_ics does.
+    """
+    selected = [
+        entry for entry in entries
+        if (start is None or entry['date'] >= start) and (end is None or entry['date'] < end)
+    ]
+    years = expansion_years(entries, recurrences)
+    if recurrences and years:
+        selected += recurrences.occurrences(start or date(years.start, 1, 1), end or date(years.stop, 1, 1))
+    selected.sort(key=lambda entry: entry['date'])
+    return selected
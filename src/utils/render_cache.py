@@ -0,0 +1,76 @@
+from functools import lru_cache
+from subprocess import run, PIPE, DEVNULL
+import hashlib
+import os
+import shutil
+
+from utils.disk_cache import atomic_write, default_cache_dir, evict_lru, touch
+from utils.latex_compiler import compile_latex
+
+
+@lru_cache(maxsize=None)
+def engine_version(engine):
+    """Return the first line of `engine --version`, or "" if it cannot be run."""
+    try:
+        result = run([engine, "--version"], stdout=PIPE, stderr=DEVNULL, text=True)
+    except OSError:
+        return ""
+    return result.stdout.splitlines()[0] if result.stdout else ""
+
+
+class RenderCache:
+    """On-disk cache of compiled PDFs.
+
+    Entries are keyed by a hash of the LaTeX source, the engine and the
+    engine version, so identical source is only ever compiled once. Files
+    are touched on every hit and the least recently used ones are removed
+    once the cache grows beyond max_bytes. Misses are compiled with
+    compiler, which takes the same arguments as compile_latex.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=200 * 1024 * 1024, compiler=compile_latex):
+        self.cache_dir = cache_dir or default_cache_dir("renders")
+        self.max_bytes = max_bytes
+        self.compiler = compiler
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, latex_code, engine="pdflatex", version=None):
+        """Hash the source with the engine and its version, looked up with `engine --version` unless given."""
+        if version is None:
+            version = engine_version(engine)
+        digest = hashlib.sha256()
+        for part in (engine, version, latex_code):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def pdf_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get_pdf(self, key):
+        """Return the cached PDF path for key, or None on a miss."""
+        path = self.pdf_path(key)
+        return path if touch(path) else None
+
+    def put_pdf(self, key, pdf_file):
+        """Copy a compiled PDF into the cache and return its cached path."""
+        path = self.pdf_path(key)
+        atomic_write(path, lambda tmp_path: shutil.copyfile(pdf_file, tmp_path))
+        self.evict(keep=key)
+        return path
+
+    def compile(self, latex_code, work_dir, engine="pdflatex", cancel_event=None):
+        """Return a cached PDF for latex_code, compiling it in work_dir on a miss."""
+        key = self.key(latex_code, engine)
+        return self.render(key, lambda: self.compiler(latex_code, work_dir, engine=engine, cancel_event=cancel_event))
+
+    def render(self, key, render):
+        """Return the cached PDF for key, or call render() to produce it and cache the result."""
+        cached = self.get_pdf(key)
+        if cached:
+            return cached
+        return self.put_pdf(key, render())
+
+    def evict(self, keep=None):
+        """Delete least recently used files until the cache fits in max_bytes."""
+        evict_lru(self.cache_dir, self.max_bytes, keep)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The application imports its modules as utils.*, relative to src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
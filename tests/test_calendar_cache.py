@@ -0,0 +1,89 @@
+import os
+
+from utils import calendar_cache
+from utils.calendar_cache import CalendarCache
+from utils.ics_parser import parse_ics
+
+
+def event(number, summary=None, day=None):
+    day = day or number
+    return (f"BEGIN:VEVENT\r\nUID:event-{number}\r\nSEQUENCE:0\r\n"
+            f"DTSTART:202403{day:02d}T090000\r\nDTEND:202403{day:02d}T103000\r\n"
+            f"SUMMARY:{summary or f'Shift {number}'}\r\nDESCRIPTION:Room {number}\r\nEND:VEVENT\r\n")
+
+
+def write_calendar(path, events, mtime_ns):
+    path.write_text("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + "".join(events) + "END:VCALENDAR\r\n", newline="")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def rows(entries):
+    return sorted((str(entry['summary']), entry['date'], entry['start_time'], entry['end_time'],
+                   str(entry['description']), entry['uid'], entry['sequence']) for entry in entries)
+
+
+class ParseCounter:
+    """Counts the events parsed by CalendarCache, to tell a cache hit or an incremental parse from a full one."""
+
+    def __init__(self, monkeypatch):
+        self.count = 0
+        parse = calendar_cache.entry_from_block
+
+        def counting(lines, *args):
+            self.count += 1
+            return parse(lines, *args)
+
+        monkeypatch.setattr(calendar_cache, "entry_from_block", counting)
+
+
+def test_cache_follows_appends_edits_and_shrinks(tmp_path, monkeypatch):
+    cache = CalendarCache(str(tmp_path / "cache"))
+    parsed = ParseCounter(monkeypatch)
+    path = tmp_path / "calendar.ics"
+    events = [event(number) for number in range(1, 6)]
+
+    def load(expected_parses):
+        parsed.count = 0
+        entries, _ = cache.load_parsed(ics_path)
+        assert rows(entries) == rows(parse_ics(ics_path))
+        assert parsed.count == expected_parses
+        return entries
+
+    ics_path = write_calendar(path, events, 1_000_000_000)
+    load(5)
+    # Unchanged file: served from the record
+    load(0)
+    # Same content, new mtime: the content hash matches, nothing is parsed
+    write_calendar(path, events, 2_000_000_000)
+    load(0)
+
+    # Appended events: only the new ones are parsed, twice in a row, so the stored prefix hash moves along
+    events.append(event(6))
+    write_calendar(path, events, 3_000_000_000)
+    load(1)
+    events += [event(7), event(8, day=2)]
+    write_calendar(path, events, 4_000_000_000)
+    assert len(load(2)) == 8
+
+    # An event edited in the middle changes the parsed prefix, so the whole file is parsed again
+    events[2] = event(3, summary="Shift 3 moved", day=20)
+    write_calendar(path, events, 5_000_000_000)
+    assert "Shift 3 moved" in [str(entry['summary']) for entry in load(8)]
+
+    # A shrunk file drops the removed events
+    del events[5:]
+    write_calendar(path, events, 6_000_000_000)
+    assert len(load(5)) == 5
+
+
+def test_edit_with_unchanged_size_is_parsed_again(tmp_path, monkeypatch):
+    cache = CalendarCache(str(tmp_path / "cache"))
+    ParseCounter(monkeypatch)
+    path = tmp_path / "calendar.ics"
+    ics_path = write_calendar(path, [event(1), event(2, summary="Shift A")], 1_000_000_000)
+    cache.load_parsed(ics_path)
+
+    write_calendar(path, [event(1), event(2, summary="Shift B")], 2_000_000_000)
+    entries, _ = cache.load_parsed(ics_path)
+    assert rows(entries) == rows(parse_ics(ics_path))
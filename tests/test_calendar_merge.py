@@ -0,0 +1,83 @@
+from datetime import date, time
+
+import numpy as np
+
+from utils.calendar_merge import diff_entries, merge_entries
+from utils.entry_store import EntryStore
+from utils.ics_parser import parse_ics
+
+
+def event(number, summary=None, day=None, uid=None, sequence=0, end="100000"):
+    day = day or number
+    return (f"BEGIN:VEVENT\r\nUID:{uid or f'event-{number}'}\r\nSEQUENCE:{sequence}\r\n"
+            f"DTSTART:202403{day:02d}T090000\r\nDTEND:202403{day:02d}T{end}\r\n"
+            f"SUMMARY:{summary or f'Shift {number}'}\r\nEND:VEVENT\r\n")
+
+
+def write_calendar(path, events):
+    path.write_text("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + "".join(events) + "END:VCALENDAR\r\n", newline="")
+    return parse_ics(str(path))
+
+
+def summaries(entries):
+    return [str(entry['summary']) for entry in entries]
+
+
+def test_diff_entries_after_append_edit_and_shrink(tmp_path):
+    path = tmp_path / "calendar.ics"
+    events = [event(number) for number in range(1, 6)]
+    old = write_calendar(path, events)
+
+    events.append(event(6))
+    events[2] = event(3, summary="Shift 3 moved", end="123000")
+    del events[4]
+    new = write_calendar(path, events)
+
+    diff = diff_entries(old, new)
+    assert summaries(diff.added) == ["Shift 6"]
+    assert summaries(diff.removed) == ["Shift 5"]
+    assert summaries(diff.changed) == ["Shift 3 moved"]
+    assert summaries(diff.changed_from) == ["Shift 3"]
+    # Unchanged entries point at their old row, added and changed ones at -1
+    assert [old[position]['uid'] if position >= 0 else None for position in diff.old_positions] == \
+        ["event-1", "event-2", None, "event-4", None]
+
+    # A store carried over through the diff matches one built from a fresh parse
+    store = EntryStore.from_diff(EntryStore(old, 20), new, diff.old_positions)
+    fresh = EntryStore(new, 20)
+    np.testing.assert_array_equal(store.month, fresh.month)
+    np.testing.assert_array_equal(store.hours, fresh.hours)
+    np.testing.assert_array_equal(store.salary, fresh.salary)
+
+
+def test_diff_entries_tells_occurrences_of_one_series_apart():
+    def occurrence(day, summary="Training"):
+        return {'uid': "series", 'summary': summary, 'date': date(2024, 3, day), 'start_time': time(9),
+                'end_time': time(10), 'description': "", 'sequence': 0}
+
+    old = [occurrence(1), occurrence(8), occurrence(15)]
+    new = [occurrence(1), occurrence(8, "Training moved"), occurrence(22)]
+    diff = diff_entries(old, new)
+    assert [entry['date'].day for entry in diff.added] == [22]
+    assert [entry['date'].day for entry in diff.removed] == [15]
+    assert summaries(diff.changed) == ["Training moved"]
+    assert diff.old_positions == [0, -1, -1]
+
+
+def test_merge_entries_keeps_the_latest_copy_of_shared_events(tmp_path):
+    work = write_calendar(tmp_path / "work.ics", [
+        event(1, summary="Meeting", uid="shared"),
+        event(2, summary="Tie first", uid="tie"),
+        event(4),
+    ])
+    personal = write_calendar(tmp_path / "personal.ics", [
+        event(1, summary="Meeting moved", uid="shared", sequence=2),
+        event(2, summary="Tie second", uid="tie"),
+        event(3),
+    ])
+    no_uid = [{'uid': "", 'summary': "No UID", 'date': date(2024, 3, 5), 'start_time': time(9),
+               'end_time': time(10), 'description': "", 'sequence': 0}]
+
+    merged = merge_entries([work, personal, no_uid, no_uid])
+    assert summaries(merged) == ["Meeting moved", "Tie first", "Shift 3", "Shift 4", "No UID", "No UID"]
+    assert [entry['date'] for entry in merged] == sorted(entry['date'] for entry in merged)
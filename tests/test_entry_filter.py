@@ -0,0 +1,52 @@
+from datetime import date, time
+
+from utils.entry_filter import EntryFilter
+from utils.entry_store import EntryStore
+
+SUMMARIES = ["Exam supervision 4", "Office hours 2", "Lab session", "Übung Analysis", "exam review", "Office"]
+DESCRIPTIONS = ["", "room 2.14", "bring the exam sheets", "Raum 3", "review: exam 4 & exam 5"]
+QUERIES = ["", "e", "ex", "exa", "exam", "exam ", "exam s", "exam supervision 4", "office hours 2", "übung",
+           "am 4", "m 4", "review", "xyz", "4", "2.1", "exam 5", "office", "zz9"]
+
+
+def make_store(count=120):
+    entries = [{'summary': SUMMARIES[i % len(SUMMARIES)], 'description': DESCRIPTIONS[i % len(DESCRIPTIONS)],
+                'date': date(2024, i % 12 + 1, 1), 'start_time': time(9), 'end_time': time(10)}
+               for i in range(count)]
+    entries.sort(key=lambda entry: entry['date'])
+    return EntryStore(entries, 100), entries
+
+
+def expected_rows(entries, query, months):
+    query = query.lower()
+    return [row for row, entry in enumerate(entries)
+            if entry['date'].month in months
+            and query in f"{entry['summary'].lower()}\0{entry['description'].lower()}"]
+
+
+def test_filter_matches_a_plain_scan_with_and_without_the_index():
+    store, entries = make_store()
+    for built in (False, True):
+        entry_filter = EntryFilter(store)
+        if built:
+            entry_filter.build_index()
+        for months in (range(1, 13), [3], [1, 6, 7, 12]):
+            # Typed one character at a time, so later queries narrow the cached results of earlier ones
+            for query in QUERIES:
+                assert entry_filter.filter(query, months).tolist() == expected_rows(entries, query, months), \
+                    (built, query, list(months))
+
+
+def test_no_months_selects_nothing():
+    store, _ = make_store()
+    entry_filter = EntryFilter(store)
+    entry_filter.build_index()
+    assert entry_filter.filter("exam", []).tolist() == []
+
+
+def test_cancelled_build_keeps_filtering():
+    store, entries = make_store()
+    entry_filter = EntryFilter(store)
+    entry_filter.cancel_index()
+    entry_filter.build_index()
+    assert entry_filter.filter("exam 4", range(1, 13)).tolist() == expected_rows(entries, "exam 4", range(1, 13))
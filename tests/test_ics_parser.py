@@ -0,0 +1,29 @@
+from datetime import date
+
+from utils import ics_parser
+from utils.ics_parser import entry_from_block, iter_ics_entries
+
+OUTLOOK_EVENT = [
+    'BEGIN:VEVENT',
+    'UID:outlook-1',
+    'SUMMARY:New year shift',
+    'DTSTART;TZID="(UTC+01:00) Amsterdam, Berlin":20230101T090000',
+    'DTEND;TZID="(UTC+01:00) Amsterdam, Berlin":20230101T100000',
+    'END:VEVENT',
+]
+
+
+def test_window_applies_to_quoted_tzid_with_colon(tmp_path):
+    path = tmp_path / "outlook.ics"
+    path.write_text("BEGIN:VCALENDAR\r\n" + "\r\n".join(OUTLOOK_EVENT) + "\r\nEND:VCALENDAR\r\n")
+
+    assert list(iter_ics_entries(str(path), date(2024, 1, 1), date(2025, 1, 1))) == []
+    entries = list(iter_ics_entries(str(path), date(2023, 1, 1), date(2024, 1, 1)))
+    assert [entry['date'] for entry in entries] == [date(2023, 1, 1)]
+
+
+def test_window_is_checked_when_the_raw_pattern_misses(monkeypatch):
+    monkeypatch.setattr(ics_parser, "_raw_start_date", lambda lines: (None, False))
+
+    assert entry_from_block(OUTLOOK_EVENT, date(2024, 1, 1), date(2025, 1, 1)) is None
+    assert entry_from_block(OUTLOOK_EVENT, date(2023, 1, 1), date(2023, 1, 2))['date'] == date(2023, 1, 1)
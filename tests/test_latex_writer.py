@@ -0,0 +1,35 @@
+from datetime import date, time
+
+from utils.latex_writer import escape_latex, generate_latex_table
+
+CONFIG_INFO = {
+    'name': "\\input{/etc/passwd}", 'address_line1': "50% off", 'address_line2': "A & B", 'address_line3': "",
+    'bank_name': "Bank_1", 'clearing_number': "#1", 'account_number': "~^", 'iban': "{x}", 'bic': "$",
+}
+
+
+def test_escape_latex_sets_special_characters_literally():
+    assert escape_latex("\\input{a} & 5% $x$ #1 a_b ~ ^\nnext") == (
+        "\\textbackslash{}input\\{a\\} \\& 5\\% \\$x\\$ \\#1 a\\_b \\textasciitilde{} \\textasciicircum{} next")
+
+
+def test_user_text_cannot_inject_commands():
+    entries = [{'summary': "\\write18{rm -rf ~} & \\input{/etc/passwd}", 'date': date(2024, 1, 2),
+                'start_time': time(9), 'end_time': time(10), 'description': "", 'entry_salary': 100.0}]
+    latex = generate_latex_table(entries, 100.0, 1.0, 100.0, CONFIG_INFO)
+    assert "\\input{" not in latex
+    assert "\\write18" not in latex
+    assert "\\textbackslash{}input\\{/etc/passwd\\}" in latex
+
+
+def month_entries(months, per_month):
+    return [{'summary': "Shift", 'date': date(2024, month, day + 1), 'start_time': time(9), 'end_time': time(10),
+             'description': "", 'entry_salary': 100.0}
+            for month in range(1, months + 1) for day in range(per_month)]
+
+
+def test_auto_table_mode_counts_month_headings_and_totals():
+    # 30 entries over 6 months render 44 table rows, more than fit under the header on one page
+    assert "\\begin{longtable}" in generate_latex_table(month_entries(6, 5), 3000.0, 30.0, 100.0, CONFIG_INFO)
+    # 30 entries in one month render 34 rows and still fit
+    assert "\\begin{table}" in generate_latex_table(month_entries(1, 30), 3000.0, 30.0, 100.0, CONFIG_INFO)
@@ -0,0 +1,62 @@
+from datetime import date, time
+
+from utils.ics_parser import parse_ics
+
+MASTER = """BEGIN:VEVENT
+UID:training
+DTSTART;TZID=Europe/Berlin:20240301T090000
+DTEND;TZID=Europe/Berlin:20240301T100000
+RRULE:FREQ=WEEKLY;COUNT=4
+SUMMARY:Training
+END:VEVENT
+"""
+
+MOVED = """BEGIN:VEVENT
+UID:training
+RECURRENCE-ID:20240315T080000Z
+DTSTART;TZID=Europe/Berlin:20240316T090000
+DTEND;TZID=Europe/Berlin:20240316T100000
+SUMMARY:Training moved
+END:VEVENT
+"""
+
+
+def write_calendar(tmp_path, *events):
+    path = tmp_path / "calendar.ics"
+    path.write_text("BEGIN:VCALENDAR\nVERSION:2.0\n" + "".join(events) + "END:VCALENDAR\n")
+    return str(path)
+
+
+def occurrences(path):
+    return [(str(entry['summary']), entry['date'], entry['start_time'], entry['end_time'])
+            for entry in parse_ics(path)]
+
+
+def test_override_replaces_occurrence_in_either_order(tmp_path):
+    expected = [
+        ("Training", date(2024, 3, 1), time(9), time(10)),
+        ("Training", date(2024, 3, 8), time(9), time(10)),
+        ("Training moved", date(2024, 3, 16), time(9), time(10)),
+        ("Training", date(2024, 3, 22), time(9), time(10)),
+    ]
+    assert occurrences(write_calendar(tmp_path, MASTER, MOVED)) == expected
+    assert occurrences(write_calendar(tmp_path, MOVED, MASTER)) == expected
+
+
+def test_date_override_before_master(tmp_path):
+    master = MASTER.replace("UID:training", "UID:daily").replace("FREQ=WEEKLY", "FREQ=DAILY;INTERVAL=2")
+    cancelled = "BEGIN:VEVENT\nUID:daily\nRECURRENCE-ID;VALUE=DATE:20240303\nDTSTART;VALUE=DATE:20240303\n" \
+                "STATUS:CANCELLED\nSUMMARY:Training\nEND:VEVENT\n"
+    dates = [entry[1] for entry in occurrences(write_calendar(tmp_path, cancelled, master))]
+    assert dates == [date(2024, 3, 1), date(2024, 3, 5), date(2024, 3, 7)]
+
+
+def test_rdate_periods_keep_their_duration(tmp_path):
+    master = MASTER.replace("RRULE:FREQ=WEEKLY;COUNT=4\n",
+                            "RRULE:FREQ=WEEKLY;COUNT=1\n"
+                            "RDATE;VALUE=PERIOD:20240320T130000Z/20240320T160000Z,20240322T080000Z/PT30M\n")
+    assert occurrences(write_calendar(tmp_path, master)) == [
+        ("Training", date(2024, 3, 1), time(9), time(10)),
+        ("Training", date(2024, 3, 20), time(14), time(17)),
+        ("Training", date(2024, 3, 22), time(9), time(9, 30)),
+    ]